@@ -46,8 +46,8 @@ A Generator object defines 3 methods in addition to its constructor:
                              required to have to be allowed
 - ``excludes(self, **kwargs)``: returns a list of Needs disallowing any
                                 provider of a single one
-- ``query_filter(self, **kwargs)``: returns a query filter to enable retrieval
-                                    of records
+- ``query_filter(self, identity=None, **kwargs)``: returns a query filter to
+  enable retrieval of records by the identity (``g.identity`` by default)
 
 The ``needs`` and ``excludes`` methods specify access conditions from
 the point-of-view of the object-of-concern; whereas, the ``query_filter``
@@ -68,11 +68,11 @@ A simple example of a Generator is the provided
             '''Enabling Needs.'''
             return [UserNeed(owner) for owner in record.get('owners', [])]
 
-        def query_filter(self, record=None, **kwargs):
+        def query_filter(self, record=None, identity=None, **kwargs):
             '''Filters for current identity as owner.'''
             # NOTE: implementation subject to change until permissions metadata
             #       settled
-            provides = g.identity.provides
+            provides = (identity or g.identity).provides
             for need in provides:
                 if need.method == 'id':
                     return Q('term', owners=need.value)
@@ -81,7 +81,7 @@ A simple example of a Generator is the provided
 ``RecordOwners`` allows any identity providing a `UserNeed
 <https://pythonhosted.org/Flask-Principal/#flask_principal.UserNeed>`_
 of value found in the ``owners`` metadata of a record. The
-``query_filter(self, **kwargs)``
+``query_filter(self, identity=None, **kwargs)``
 method outputs a query that returns all owned records of the current user.
 Not included in the above, because it doesn't apply to ``RecordOwners``, is
 the ``excludes(self, **kwargs)`` method.
@@ -219,9 +219,9 @@ your instance: combine and use permission Generators, Policies and Factories.
 
 from .ext import InvenioRecordsPermissions
 from .factories import record_create_permission_factory, \
-    record_delete_permission_factory, record_files_permission_factory, \
-    record_read_permission_factory, record_search_permission_factory, \
-    record_update_permission_factory
+    record_delete_permission_factory, record_files_bulk_allows, \
+    record_files_permission_factory, record_read_permission_factory, \
+    record_search_permission_factory, record_update_permission_factory
 from .policies import BasePermissionPolicy, DepositPermissionPolicy, \
     RecordPermissionPolicy
 from .version import __version__
@@ -237,6 +237,7 @@ __all__ = (
     # https://github.com/inveniosoftware/cookiecutter-invenio-module/pull/129
     'record_create_permission_factory',
     'record_delete_permission_factory',
+    'record_files_bulk_allows',
     'record_files_permission_factory',
     'record_search_permission_factory',
     'record_read_permission_factory',
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+"""Access control summaries of records.
+
+The generators don't dig into the record metadata themselves: they consume
+an :class:`AccessSummary`, derived once per record revision.
+"""
+
+from collections import namedtuple
+
+from flask import current_app, has_app_context
+from flask_principal import RoleNeed, UserNeed
+
+SCHEME_TO_NEED = {
+    'person': UserNeed,
+    'role': RoleNeed,
+    'group': RoleNeed,
+}
+"""Need class of the identities of each access level scheme.
+
+The ``id`` of an identity is the value of its Need (e.g. the role name).
+"""
+
+METHOD_TO_SCHEMES = {
+    'id': ['person'],
+    'role': ['group', 'role'],
+}
+"""Access level schemes of the identities providing each Need method."""
+
+
+def _unique(items):
+    """Return the items without duplicates, in order."""
+    seen = set()
+    return tuple(i for i in items if not (i in seen or seen.add(i)))
+
+
+class AccessSummary(namedtuple('AccessSummary', [
+        'owners', 'restricted', 'access_levels'])):
+    """Access control summary of a record.
+
+    - ``owners``: tuple of the UserNeeds of the owners.
+    - ``restricted``: whether the metadata is restricted.
+    - ``access_levels``: dict of access level to the tuple of Needs of the
+      identities having it (see ``SCHEME_TO_NEED``).
+    """
+
+    @classmethod
+    def from_record(cls, record):
+        """Summarize the access control metadata of a record."""
+        if not record:
+            return EMPTY_SUMMARY
+
+        access_levels = record.get('internal', {}).get('access_levels', {})
+        return cls(
+            owners=_unique(UserNeed(o) for o in record.get('owners', [])),
+            restricted=bool(
+                record.get('_access', {}).get('metadata_restricted', False)
+            ),
+            access_levels={
+                level: _unique(
+                    # Name "identity" is used bc it correlates with
+                    # flask-principal identity while not being one.
+                    SCHEME_TO_NEED[identity['scheme']](identity['id'])
+                    for identity in identities
+                    if identity.get('scheme') in SCHEME_TO_NEED and
+                    identity.get('id')
+                )
+                for level, identities in access_levels.items()
+            },
+        )
+
+    def level_needs(self, access_levels):
+        """Return the Needs of the identities having any of the levels."""
+        return list(_unique(
+            need for level in access_levels
+            for need in self.access_levels.get(level, ())
+        ))
+
+
+EMPTY_SUMMARY = AccessSummary(owners=(), restricted=False, access_levels={})
+
+
+def _summary_cache():
+    """Return the summary cache of the application, if any."""
+    if not has_app_context():
+        return None
+    state = current_app.extensions.get('invenio-records-permissions')
+    return state.summary_cache if state else None
+
+
+def get_access_summary(record):
+    """Return the :class:`AccessSummary` of a record.
+
+    Summaries of stored records (with an ``id`` and a ``revision_id``) are
+    cached per revision in the application, so changes to a record only show
+    once it is committed.
+
+    :param record: The record (or record-like dict), or ``None``.
+    """
+    record_id = getattr(record, 'id', None)
+    revision_id = getattr(record, 'revision_id', None)
+    cache = _summary_cache()
+    if cache is None or record_id is None or revision_id is None:
+        return AccessSummary.from_record(record)
+
+    key = (str(record_id), revision_id)
+    summary = cache.get(key)
+    if summary is None:
+        summary = AccessSummary.from_record(record)
+        cache.set(key, summary)
+    return summary
@@ -9,33 +9,169 @@
 """Invenio Records Permissions API."""
 
 from elasticsearch_dsl.query import Q
-from flask import current_app
+from flask import current_app, g
+from invenio_search import current_search_client
 from invenio_search.api import DefaultFilter, RecordsSearch
 
+from .cache import filter_cache_key
 from .factories import record_read_permission_factory
+from .generators import provides_index
+from .indexer import indexed_filter
+from .policies import get_deposit_permission_policy
+from .queries import simplify_filters
 
 
-def rdm_records_filter():
-    """Records filter."""
+def policy_filter(policy, identity=None):
+    """Search filter of a policy: its query filters OR'ed together.
+
+    The filter is simplified (see
+    :func:`invenio_records_permissions.queries.simplify_filters`).
+
+    With an identity, the filter of a policy over no object is cached as a
+    dict per policy class, action and identity (see
+    ``RECORDS_PERMISSIONS_FILTER_CACHE``), so that the generators don't have
+    to build it again.
+
+    With ``RECORDS_PERMISSIONS_INDEXED_FILTER``, the filter is a lookup of
+    the identity in the indexed permissions instead (see
+    :func:`invenio_records_permissions.indexer.indexed_filter`).
+
+    :param policy: The policy instance.
+    :param identity: The identity the filter is built for.
+    """
+    state = current_app.extensions.get('invenio-records-permissions')
+    cache = state.filter_cache if state else None
+    key = filter_cache_key(policy, identity) \
+        if identity is not None and cache is not None else None
+
+    if key is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return Q(cached)
+
+    if identity is not None and \
+            current_app.config.get('RECORDS_PERMISSIONS_INDEXED_FILTER'):
+        qf = indexed_filter(policy, identity)
+    else:
+        filters = policy.get_query_filters(identity)
+        qf = simplify_filters(filters) if filters else Q()
+
+    if key is not None:
+        cache.set(key, qf.to_dict())
+    return qf
+
+
+def rdm_records_filter(identity=None):
+    """Records filter.
+
+    :param identity: The identity searching. Defaults to ``g.identity``.
+    """
     # TODO: Implement with new permissions metadata
     try:
         perm_factory = current_app.config["RECORDS_REST_ENDPOINTS"]["recid"][
             "read_permission_factory_imp"
         ]()  # noqa
     except KeyError:
-        perm_factory = record_read_permission_factory
+        perm_factory = record_read_permission_factory()
     # FIXME: this might fail if factory returns None, meaning no "query_filter"
     # was implemente in the generators. However, IfPublic should always be
     # there.
 
-    filters = perm_factory.query_filters
-    if filters:
-        qf = None
-        for f in filters:
-            qf = qf | f if qf else f
-        return qf
-    else:
-        return Q()
+    if identity is None:
+        identity = getattr(g, 'identity', None)
+    return policy_filter(perm_factory, identity)
+
+
+def deposits_filter(identity=None):
+    """Deposits filter, the deposits an identity can search.
+
+    :param identity: The identity searching. Defaults to ``g.identity``.
+    """
+    if identity is None:
+        identity = getattr(g, 'identity', None)
+    PermissionPolicy = get_deposit_permission_policy()
+    return policy_filter(PermissionPolicy(action='search'), identity)
+
+
+def _policy_class(policy):
+    """Return a policy class, given as such or by its registered name."""
+    if isinstance(policy, str):
+        return current_app.extensions['invenio-records-permissions'] \
+            .get_policy(policy)
+    return policy
+
+
+def multi_policy_filters(searches, identity=None, action='read'):
+    """Search filters of several indices, each with its own policy.
+
+    The filters are built in one pass: the Needs of the identity are parsed
+    once for all the generators (see
+    :func:`invenio_records_permissions.generators.provides_index`) and the
+    filter of a policy is only built once, whatever its number of indices.
+
+    :param searches: Iterable of ``(index, policy)`` pairs. A policy is a
+        policy class or the name it is registered under in the extension
+        (e.g. ``'records'``).
+    :param identity: The identity searching. Defaults to ``g.identity``.
+    :param action: The action of the policies filtering the searches.
+    :returns: A list of ``(index, filter)`` pairs, in order.
+    """
+    if identity is None:
+        identity = getattr(g, 'identity', None)
+    if identity is not None:
+        provides_index(identity)
+
+    filters = {}
+    result = []
+    for index, policy in searches:
+        policy = _policy_class(policy)
+        if policy not in filters:
+            filters[policy] = policy_filter(policy(action=action), identity)
+        result.append((index, filters[policy]))
+    return result
+
+
+def multi_policy_msearch_body(searches, identity=None, action='read',
+                              **body):
+    """Return the ``_msearch`` body of permission filtered searches.
+
+    :param searches: Iterable of ``(index, policy, query)`` triples, the
+        query (a ``Q`` object, a dict or ``None`` to match all) being
+        filtered by the policy (see :func:`multi_policy_filters`).
+    :param identity: The identity searching. Defaults to ``g.identity``.
+    :param action: The action of the policies filtering the searches.
+    :param body: Other parameters of every search body (e.g. ``size``).
+    :returns: The list of alternating header and body dicts.
+    """
+    searches = list(searches)
+    filters = multi_policy_filters(
+        [(index, policy) for index, policy, _ in searches], identity, action
+    )
+
+    msearch = []
+    for (index, _, query), (_, qf) in zip(searches, filters):
+        clauses = {'filter': [qf]}
+        if query:
+            clauses['must'] = [Q(query)]
+        msearch.append({'index': index})
+        msearch.append(dict(body, query=Q('bool', **clauses).to_dict()))
+    return msearch
+
+
+def multi_policy_search(searches, identity=None, action='read', client=None,
+                        **body):
+    """Run permission filtered searches in a single ``_msearch`` request.
+
+    See :func:`multi_policy_msearch_body` for the parameters.
+
+    :param client: The Elasticsearch client. Defaults to
+        ``current_search_client``.
+    :returns: The list of the responses of the searches, in order.
+    """
+    client = client or current_search_client
+    return client.msearch(body=multi_policy_msearch_body(
+        searches, identity=identity, action=action, **body
+    ))['responses']
 
 
 # TODO: Move this to invenio-rdm-records and
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+"""In-process caches."""
+
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from flask import g, has_app_context
+
+
+class TTLCache(object):
+    """Thread-safe in-process LRU cache with an optional time to live.
+
+    It implements the subset of the `cachelib
+    <https://cachelib.readthedocs.io>`_ interface used by this module
+    (``get``, ``set``, ``delete`` and ``clear``), so that a shared cache
+    (e.g. a ``RedisCache``) can be configured in its place.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, timer=time.monotonic):
+        """Constructor.
+
+        :param maxsize: Maximum number of entries. The least recently used
+            entries are dropped first.
+        :param ttl: Number of seconds after which an entry expires.
+            ``None`` or ``0`` to never expire.
+        :param timer: Function returning the current time in seconds.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the value stored under ``key`` or ``None``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= self.timer():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        """Store ``value`` under ``key``.
+
+        :param timeout: Time to live of this entry, defaults to ``ttl``.
+        """
+        ttl = self.ttl if timeout is None else timeout
+        expires_at = self.timer() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return True
+
+    def delete(self, key):
+        """Delete the entry of ``key``."""
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        """Delete all entries."""
+        with self._lock:
+            self._entries.clear()
+        return True
+
+    def __len__(self):
+        """Number of entries, including the expired ones not yet dropped."""
+        return len(self._entries)
+
+    def __bool__(self):
+        """Whether there is a cache, i.e. always (even if it is empty).
+
+        invenio-access only uses its ``ACCESS_CACHE`` if it is truthy.
+        """
+        return True
+
+
+def identity_fingerprint(identity):
+    """Return a stable fingerprint of the Needs provided by an identity.
+
+    The fingerprint is computed once per identity (and again if its Needs
+    change).
+    """
+    provides = frozenset(identity.provides)
+    cached = vars(identity).get('_records_permissions_fingerprint')
+    if cached is not None and cached[0] == provides:
+        return cached[1]
+
+    fingerprint = hashlib.sha1('|'.join(
+        sorted(repr(need) for need in provides)
+    ).encode('utf-8')).hexdigest()
+    identity._records_permissions_fingerprint = (provides, fingerprint)
+    return fingerprint
+
+
+def filter_cache_key(policy, identity):
+    """Key of the query filter of a policy for an identity.
+
+    The filters of policies over objects (see ``policy.over``) may depend
+    on them and aren't cached: ``None`` is returned.
+    """
+    if any(obj is not None for obj in policy.over.values()):
+        return None
+    return 'filter::{0.__module__}.{0.__qualname__}::{1}::{2}'.format(
+        policy.__class__, policy.action, identity_fingerprint(identity)
+    )
+
+
+class DecisionCache(object):
+    """Cache of the decisions of policies, with hit and miss counters.
+
+    The keys carry a *generation*, shared by all the processes using the
+    same backend, so that all the decisions can be invalidated at once
+    (see :meth:`invalidate`), even in caches which can't be cleared safely.
+    The generation is read once per application context.
+    """
+
+    GENERATION_KEY = 'decision::generation'
+
+    def __init__(self, cache):
+        """Constructor.
+
+        :param cache: The backend (e.g. a :class:`TTLCache`).
+        """
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def generation(self):
+        """Return the current generation of the decisions."""
+        if has_app_context():
+            generation = g.get('_records_permissions_generation')
+            if generation is not None:
+                return generation
+
+        generation = self.cache.get(self.GENERATION_KEY)
+        if generation is None:
+            generation = uuid.uuid4().hex
+            self.cache.set(self.GENERATION_KEY, generation, timeout=0)
+        if has_app_context():
+            g._records_permissions_generation = generation
+        return generation
+
+    def key(self, evaluation_key, identity):
+        """Key of a decision.
+
+        :param evaluation_key: The policy class, action, record id and
+            revision of the evaluation (see
+            ``BasePermissionPolicy._evaluation_key``).
+        :param identity: The identity the decision is made for.
+        """
+        policy, action, record_id, revision_id = evaluation_key
+        return 'decision::{0}::{1.__module__}.{1.__qualname__}::{2}::{3}' \
+            '::{4}::{5}'.format(
+                self.generation(), policy, action, record_id, revision_id,
+                identity_fingerprint(identity)
+            )
+
+    def get(self, key):
+        """Return the cached decision or ``None``, counting hits/misses."""
+        decision = self.cache.get(key)
+        with self._lock:
+            if decision is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return decision
+
+    def set(self, key, decision):
+        """Cache a decision."""
+        self.cache.set(key, decision)
+
+    def invalidate(self):
+        """Invalidate all the decisions by starting a new generation."""
+        self.cache.set(self.GENERATION_KEY, uuid.uuid4().hex, timeout=0)
+        if has_app_context():
+            g.pop('_records_permissions_generation', None)
+
+    def clear(self):
+        """Delete all the decisions of the backend."""
+        self.cache.clear()
+        if has_app_context():
+            g.pop('_records_permissions_generation', None)
+
+    def stats(self):
+        """Return the number of ``hits`` and ``misses`` and their ratio."""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': float(hits) / total if total else 0.0,
+        }
+
+    def reset_stats(self):
+        """Reset the counters."""
+        with self._lock:
+            self.hits = self.misses = 0
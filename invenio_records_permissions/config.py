@@ -13,3 +13,81 @@ RECORDS_PERMISSIONS_RECORD_POLICY = (
     'invenio_records_permissions.policies.RecordPermissionPolicy'
 )
 """PermissionPolicy used by provided record permission factories."""
+
+RECORDS_PERMISSIONS_DEPOSIT_POLICY = (
+    'invenio_records_permissions.policies.DepositPermissionPolicy'
+)
+"""PermissionPolicy used by provided deposit permission factories."""
+
+RECORDS_PERMISSIONS_BUCKET_CACHE = None
+"""Cache of the id of the record owning a bucket.
+
+``None`` for an in-process cache (see ``RECORDS_PERMISSIONS_CACHE_SIZE`` and
+``RECORDS_PERMISSIONS_CACHE_TTL``), ``False`` to disable it, or a cache
+instance (or importable string pointing to one) implementing ``get``, ``set``,
+``delete`` and ``clear`` like `cachelib <https://cachelib.readthedocs.io>`_
+caches do, to share it between processes.
+
+Cached ids are invalidated when RecordsBuckets change.
+"""
+
+RECORDS_PERMISSIONS_ACTION_CACHE = None
+"""Cache of the expansion of ActionNeeds into the Users/Roles providing them.
+
+Same values as ``RECORDS_PERMISSIONS_BUCKET_CACHE``. The expansions are
+cached by invenio-access: this cache is installed as its cache, unless
+invenio-access already has one (see its ``ACCESS_CACHE``).
+
+Cached expansions are invalidated when ActionUsers, ActionRoles,
+ActionSystemRoles or Roles change. Other processes only notice these changes
+through a shared cache or once their entries expire.
+"""
+
+RECORDS_PERMISSIONS_FILTER_CACHE = None
+"""Cache of the search filters (as dicts) per policy, action and identity.
+
+Same values as ``RECORDS_PERMISSIONS_BUCKET_CACHE``. Entries only expire.
+"""
+
+RECORDS_PERMISSIONS_DECISION_CACHE = False
+"""Cache of the decisions of the policies, across requests.
+
+Disabled by default. Same values as ``RECORDS_PERMISSIONS_BUCKET_CACHE``.
+
+Decisions are cached per policy class, action, record id and revision and
+fingerprint of the Needs of the identity, so that changes to a record (a new
+revision) or to the roles of a user (other Needs) make new keys. Changes to
+the actions granted to users or roles, and to role memberships, invalidate
+all the decisions. Only the policies evaluated over a stored record (or no
+object at all) are cached, see ``BasePermissionPolicy.allows``.
+"""
+
+RECORDS_PERMISSIONS_CACHE_SIZE = 1024
+"""Maximum number of entries of each in-process cache."""
+
+RECORDS_PERMISSIONS_CACHE_TTL = 60
+"""Seconds after which the entries of the in-process caches expire."""
+
+RECORDS_PERMISSIONS_INDEX_PERMISSIONS = False
+"""Write the permissions of the records into their indexed documents.
+
+Requires invenio-indexer. See :mod:`invenio_records_permissions.indexer`.
+"""
+
+RECORDS_PERMISSIONS_INDEXED_ACTIONS = ['read']
+"""Actions of the record policy whose permissions are indexed."""
+
+RECORDS_PERMISSIONS_INDEXED_FILTER = False
+"""Filter searches on the indexed permissions instead of the query filters.
+
+Only enable it once all the records were indexed with their permissions.
+"""
+
+RECORDS_PERMISSIONS_PROFILING = False
+"""Profile the evaluation of the policies.
+
+Records the wall time, the number of calls and of database queries of the
+generator methods and of the loading of the permissions, see
+:mod:`invenio_records_permissions.instrumentation`. Only enable it while
+investigating: it adds overhead to every permission check.
+"""
@@ -11,3 +11,7 @@
 
 class UnknownGeneratorError(Exception):
     """Error raised when an unknown generator is detected."""
+
+
+class PostFilteringError(Exception):
+    """Error raised when a search can't be post-filtered."""
@@ -11,7 +11,147 @@
 
 from __future__ import absolute_import, print_function
 
+from werkzeug.utils import cached_property
+
 from . import config
+from .cache import DecisionCache, TTLCache
+from .indexer import register_indexer_receiver
+from .instrumentation import PermissionsProfiler
+from .policies.deposits import DepositPermissionPolicy
+from .policies.records import RecordPermissionPolicy, obj_or_import_string
+from .receivers import register_receivers
+
+
+class _RecordsPermissionsState(object):
+    """Records permissions state storing the caches."""
+
+    def __init__(self, app):
+        """Initialize state.
+
+        :param app: The Flask application.
+        """
+        self.app = app
+        self.policies = {}
+        self._resolved_policies = {}
+        self._action_cache = None
+
+    def register_policy(self, name, config_key, default=None):
+        """Register a permission policy resolvable by name.
+
+        :param name: The name of the policy (e.g. ``'records'``).
+        :param config_key: The configuration variable holding the policy
+            class or its import path.
+        :param default: The policy class used if the variable isn't set.
+        """
+        self.policies[name] = (config_key, default)
+        self._resolved_policies.pop(name, None)
+
+    def get_policy(self, name):
+        """Return the policy class registered under ``name``.
+
+        The configured import path is only resolved the first time.
+
+        :raises KeyError: If no policy is registered under ``name``.
+        """
+        policy = self._resolved_policies.get(name)
+        if policy is None:
+            config_key, default = self.policies[name]
+            policy = obj_or_import_string(
+                self.app.config.get(config_key), default=default
+            )
+            self._resolved_policies[name] = policy
+        return policy
+
+    def reload_policies(self):
+        """Resolve the policies again, e.g. after a configuration change."""
+        self._resolved_policies.clear()
+
+    def _make_cache(self, config_key):
+        """Return the cache configured under ``config_key``.
+
+        ``None`` gives an in-process cache and ``False`` no cache at all.
+        """
+        cache = self.app.config.get(config_key)
+        if cache is None:
+            return TTLCache(
+                maxsize=self.app.config['RECORDS_PERMISSIONS_CACHE_SIZE'],
+                ttl=self.app.config['RECORDS_PERMISSIONS_CACHE_TTL'],
+            )
+        if cache is False:
+            return None
+        return obj_or_import_string(cache)
+
+    @cached_property
+    def action_cache(self):
+        """Cache of the ActionNeed expansions of invenio-access.
+
+        The ``RECORDS_PERMISSIONS_ACTION_CACHE`` is installed in
+        invenio-access, unless it already has a cache.
+        """
+        access = self.app.extensions['invenio-access']
+        if access.cache is None:
+            self._action_cache = self._make_cache(
+                'RECORDS_PERMISSIONS_ACTION_CACHE'
+            )
+            if self._action_cache is not None:
+                access.cache = self._action_cache
+        return access.cache
+
+    @cached_property
+    def bucket_cache(self):
+        """Cache of the record ids of buckets."""
+        return self._make_cache('RECORDS_PERMISSIONS_BUCKET_CACHE')
+
+    @cached_property
+    def summary_cache(self):
+        """In-process cache of the access summaries of record revisions."""
+        return TTLCache(
+            maxsize=self.app.config['RECORDS_PERMISSIONS_CACHE_SIZE'],
+            ttl=self.app.config['RECORDS_PERMISSIONS_CACHE_TTL'],
+        )
+
+    @cached_property
+    def filter_cache(self):
+        """Cache of the search filters."""
+        return self._make_cache('RECORDS_PERMISSIONS_FILTER_CACHE')
+
+    @cached_property
+    def decision_cache(self):
+        """Cache of the policy decisions, if enabled."""
+        cache = self._make_cache('RECORDS_PERMISSIONS_DECISION_CACHE')
+        return DecisionCache(cache) if cache is not None else None
+
+    def decision_stats(self):
+        """Return the hits and misses of the decision cache."""
+        if self.decision_cache is None:
+            return {}
+        return self.decision_cache.stats()
+
+    @cached_property
+    def profiler(self):
+        """Profiler of the policies, if ``RECORDS_PERMISSIONS_PROFILING``."""
+        if not self.app.config.get('RECORDS_PERMISSIONS_PROFILING'):
+            return None
+        return PermissionsProfiler(self.app)
+
+    def stats(self):
+        """Return the profiling statistics (see ``PermissionsProfiler``)."""
+        return self.profiler.stats() if self.profiler else {}
+
+    def reset_stats(self):
+        """Forget the profiling and decision cache statistics."""
+        if self.profiler:
+            self.profiler.reset()
+        if self.decision_cache is not None:
+            self.decision_cache.reset_stats()
+
+    def clear_caches(self):
+        """Empty all the caches."""
+        for cache in (self._action_cache, self.bucket_cache,
+                      self.summary_cache, self.filter_cache,
+                      self.decision_cache):
+            if cache is not None:
+                cache.clear()
 
 
 class InvenioRecordsPermissions(object):
@@ -25,7 +165,25 @@ class InvenioRecordsPermissions(object):
     def init_app(self, app):
         """Flask application initialization."""
         self.init_config(app)
-        app.extensions['invenio-records-permissions'] = self
+        state = _RecordsPermissionsState(app)
+        state.register_policy(
+            'records',
+            'RECORDS_PERMISSIONS_RECORD_POLICY',
+            default=RecordPermissionPolicy,
+        )
+        state.register_policy(
+            'deposits',
+            'RECORDS_PERMISSIONS_DEPOSIT_POLICY',
+            default=DepositPermissionPolicy,
+        )
+        app.extensions['invenio-records-permissions'] = state
+        if 'invenio-access' in app.extensions:
+            # Installs the cache of the ActionNeed expansions
+            state.action_cache
+        register_receivers()
+        if app.config['RECORDS_PERMISSIONS_INDEX_PERMISSIONS']:
+            register_indexer_receiver(app)
+        return state
 
     def init_config(self, app):
         """Initialize configuration."""
@@ -9,29 +9,54 @@
 
 """Deposit Permission Factories."""
 
-from ..policies import DepositPermissionPolicy
+from flask import g
+
+from ..policies import get_deposit_permission_policy
 
 
 def deposit_list_permission_factory():
     """Pre-configured deposit list permission factory."""
-    return DepositPermissionPolicy(action='list')
+    PermissionPolicy = get_deposit_permission_policy()
+    return PermissionPolicy(action='list')
 
 
-def deposit_create_permission_factory():
+def deposit_create_permission_factory(record=None):
     """Pre-configured deposit create permission factory."""
-    return DepositPermissionPolicy(action='create')
+    PermissionPolicy = get_deposit_permission_policy()
+    return PermissionPolicy(action='create', record=record)
 
 
-def deposit_read_permission_factory(record):
+def deposit_read_permission_factory(record=None):
     """Pre-configured deposit read permission factory."""
-    return DepositPermissionPolicy(action='read')
+    PermissionPolicy = get_deposit_permission_policy()
+    return PermissionPolicy(action='read', record=record)
 
 
-def deposit_update_permission_factory(record):
+def deposit_update_permission_factory(record=None):
     """Pre-configured deposit update permission factory."""
-    return DepositPermissionPolicy(action='update')
+    PermissionPolicy = get_deposit_permission_policy()
+    return PermissionPolicy(action='update', record=record)
 
 
-def deposit_delete_permission_factory(record):
+def deposit_delete_permission_factory(record=None):
     """Pre-configured deposit delete permission factory."""
-    return DepositPermissionPolicy(action='delete')
+    PermissionPolicy = get_deposit_permission_policy()
+    return PermissionPolicy(action='delete', record=record)
+
+
+def deposit_bulk_allows(records, action, identity=None):
+    """Deposit permission decisions for many deposits at once.
+
+    The policy is evaluated by a single
+    :class:`invenio_records_permissions.policies.PolicyEvaluator`, e.g. to
+    check the deposits of a listing.
+
+    :param records: The deposits.
+    :param action: The required action.
+    :param identity: The identity to check. Defaults to ``g.identity``.
+    :returns: A list of booleans, one per deposit, in order.
+    """
+    PermissionPolicy = get_deposit_permission_policy()
+    return PermissionPolicy.bulk_allows(
+        action, records, identity or g.identity
+    )
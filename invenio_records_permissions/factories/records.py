@@ -7,10 +7,13 @@
 # and/or modify it under the terms of the MIT License; see LICENSE file for
 # more details.
 
-"""Record Permission Factories."""
+"""Record Permission Factories.
 
-from invenio_files_rest.models import Bucket, ObjectVersion
-from invenio_records_files.api import Record, RecordsBuckets
+The files stack (invenio-files-rest and invenio-records-files) is only
+imported once a files permission factory is used.
+"""
+
+from flask import g
 
 from ..policies import get_record_permission_policy
 
@@ -45,41 +48,79 @@ def record_delete_permission_factory(record=None):
     return PermissionPolicy(action='delete', record=record)
 
 
-def record_files_permission_factory(obj, action):
+def _bucket_id(obj):
+    """Return the id of the bucket concerned by a files REST object.
+
+    :raises RuntimeError: If the object is unknown.
+    """
+    from invenio_files_rest.models import Bucket, ObjectVersion
+
+    if isinstance(obj, Bucket):
+        # File creation
+        return str(obj.id)
+    elif isinstance(obj, ObjectVersion):
+        # File download
+        return str(obj.bucket_id)
+    # TODO: Reassess if covering FileObject, MultipartObject
+    #       makes sense via bucket_id = str(obj.bucket_id)
+    raise RuntimeError('Unknown object')
+
+
+def record_files_permission_factory(obj, action, record=None):
     """Files permission factory for any action.
 
     :param obj: An instance of `invenio_files_rest.models.Bucket
                 <https://invenio-files-rest.readthedocs.io/en/latest/api.html
                 #invenio_files_rest.models.Bucket>`_.
     :param action: The required action.
+    :param record: The record of the bucket, if already known. Otherwise it
+        is resolved from the bucket (see
+        :func:`invenio_records_permissions.resolvers.get_bucket_record`).
     :raises RuntimeError: If the object is unknown or no record.
     :returns: A
         :class:`invenio_records_permissions.policies.base.BasePermissionPolicy`
         instance.
     """
-    if isinstance(obj, Bucket):
-        # File creation
-        bucket_id = str(obj.id)
-    elif isinstance(obj, ObjectVersion):
-        # File download
-        bucket_id = str(obj.bucket_id)
-    else:
-        # TODO: Reassess if covering FileObject, MultipartObject
-        #       makes sense via bucket_id = str(obj.bucket_id)
-        raise RuntimeError('Unknown object')
-
-    # Retrieve record
-    # WARNING: invenio-records-files implies a one-to-one relationship
-    #          between Record and Bucket, but does not enforce it
-    #          "for better future" the invenio-records-files code says
-    record_bucket = \
-        RecordsBuckets.query.filter_by(bucket_id=bucket_id).one_or_none()
-    if record_bucket:
-        record_metadata = record_bucket.record
-        record = Record(record_metadata.json, model=record_metadata)
-    else:
+    from ..resolvers import get_bucket_record
+
+    bucket_id = _bucket_id(obj)
+
+    if record is None:
+        record = get_bucket_record(bucket_id)
+    if record is None:
         raise RuntimeError('No record')
 
     PermissionPolicy = get_record_permission_policy()
 
     return PermissionPolicy(action=action, record=record)
+
+
+def record_files_bulk_allows(objs, action, identity=None):
+    """Files permission decisions for many objects at once.
+
+    The objects are grouped by bucket, the records of the buckets are
+    resolved with a single query (see
+    :func:`invenio_records_permissions.resolvers.get_buckets_records`) and
+    the policy is evaluated once per record.
+
+    :param objs: Instances of ``Bucket`` or ``ObjectVersion``.
+    :param action: The required action.
+    :param identity: The identity to check. Defaults to ``g.identity``.
+    :raises RuntimeError: If an object is unknown or has no record.
+    :returns: A list of booleans, one per object, in order.
+    """
+    from ..resolvers import get_buckets_records
+
+    identity = identity or g.identity
+    bucket_ids = [_bucket_id(obj) for obj in objs]
+
+    records = get_buckets_records(bucket_ids)
+    if len(records) != len(set(bucket_ids)):
+        raise RuntimeError('No record')
+
+    buckets = list(records)
+    PermissionPolicy = get_record_permission_policy()
+    decisions = dict(zip(buckets, PermissionPolicy.bulk_allows(
+        action, [records[bucket_id] for bucket_id in buckets], identity
+    )))
+    return [decisions[bucket_id] for bucket_id in bucket_ids]
@@ -9,29 +9,101 @@
 
 """Invenio Records Permissions Generators."""
 
-import json
 import operator
 from functools import reduce
-from itertools import chain
 
-from elasticsearch_dsl.query import Q
 from flask import g
-from flask_principal import ActionNeed, UserNeed
+from flask_principal import ActionNeed
 from invenio_access.permissions import any_user, superuser_access
-from invenio_files_rest.models import Bucket, ObjectVersion
-from invenio_records_files.api import Record
-from invenio_records_files.models import RecordsBuckets
 
+from .access import METHOD_TO_SCHEMES, get_access_summary
+from .queries import Q
 
-class Generator(object):
+
+def provides_index(identity):
+    """Index the Needs provided by an identity by method.
+
+    The index is computed once per identity (and again if its Needs change)
+    and shared by all the generators.
+
+    :returns: A dict of Need method to the sorted tuple of the values.
+    """
+    provides = frozenset(identity.provides)
+    cached = vars(identity).get('_records_permissions_index')
+    if cached is not None and cached[0] == provides:
+        return cached[1]
+
+    index = {}
+    for need in provides:
+        index.setdefault(need.method, set()).add(need.value)
+    index = {
+        method: tuple(sorted(values, key=lambda v: (str(type(v)), v)))
+        for method, values in index.items()
+    }
+    identity._records_permissions_index = (provides, index)
+    return index
+
+
+def _identity(identity=None):
+    """Return the given identity, defaulting to ``g.identity``."""
+    return identity if identity is not None else g.identity
+
+
+def _term_or_terms(field, values):
+    """Return a term query for a single value, a terms query otherwise."""
+    if len(values) == 1:
+        return Q('term', **{field: values[0]})
+    return Q('terms', **{field: list(values)})
+
+
+class _FrozenOnInit(type):
+    """Metaclass freezing the generators once they are constructed."""
+
+    def __call__(cls, *args, **kwargs):
+        """Construct the generator and freeze it."""
+        generator = super(_FrozenOnInit, cls).__call__(*args, **kwargs)
+        object.__setattr__(generator, '_frozen', True)
+        return generator
+
+
+class Generator(object, metaclass=_FrozenOnInit):
     """Parent class mapping the context when an action is allowed or denied.
 
     It does so by *generating* "needed" and "excluded" Needs. At the search
     level it implements the *query filters* to restrict the search.
 
     Any context inherits from this class.
+
+    Generators are shared by all the threads evaluating a policy, so they
+    are immutable: attributes can only be set in the constructor. Generators
+    holding state should declare it in ``__slots__``.
     """
 
+    __slots__ = ('_frozen',)
+
+    static = False
+    """Whether the generated Needs are the same whatever the object.
+
+    The Needs and excludes of static generators are computed once per policy
+    action instead of on every permission check.
+    """
+
+    def __setattr__(self, name, value):
+        """Set an attribute, only in the constructor."""
+        if getattr(self, '_frozen', False):
+            raise AttributeError(
+                "{0} is immutable, can't set {1}".format(
+                    self.__class__.__name__, name)
+            )
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        """Generators are immutable."""
+        raise AttributeError(
+            "{0} is immutable, can't delete {1}".format(
+                self.__class__.__name__, name)
+        )
+
     def needs(self, **kwargs):
         """Enabling Needs."""
         return []
@@ -40,14 +112,36 @@ class Generator(object):
         """Preventing Needs."""
         return []
 
-    def query_filter(self, **kwargs):
-        """Elasticsearch filters."""
+    def query_filter(self, identity=None, **kwargs):
+        """Elasticsearch filters.
+
+        :param identity: The identity searching. Defaults to ``g.identity``.
+        """
         return []
 
+    async def async_needs(self, **kwargs):
+        """Enabling Needs, for asynchronous evaluations.
+
+        Defaults to ``needs``: generators doing I/O should override it to
+        await it instead of blocking the event loop.
+        """
+        return self.needs(**kwargs)
+
+    async def async_excludes(self, **kwargs):
+        """Preventing Needs, for asynchronous evaluations.
+
+        Defaults to ``excludes`` (see ``async_needs``).
+        """
+        return self.excludes(**kwargs)
+
 
 class AnyUser(Generator):
     """Allows any user."""
 
+    __slots__ = ()
+
+    static = True
+
     def __init__(self):
         """Constructor."""
         super(AnyUser, self).__init__()
@@ -65,6 +159,10 @@ class AnyUser(Generator):
 class SuperUser(Generator):
     """Allows super users."""
 
+    __slots__ = ()
+
+    static = True
+
     def __init__(self):
         """Constructor."""
         super(SuperUser, self).__init__()
@@ -82,6 +180,10 @@ class SuperUser(Generator):
 class Disable(Generator):
     """Denies ALL users including super users."""
 
+    __slots__ = ()
+
+    static = True
+
     def __init__(self):
         """Constructor."""
         super(Disable, self).__init__()
@@ -98,6 +200,10 @@ class Disable(Generator):
 class Admin(Generator):
     """Allows users with admin-access (different from superuser-access)."""
 
+    __slots__ = ()
+
+    static = True
+
     def __init__(self):
         """Constructor."""
         super(Admin, self).__init__()
@@ -110,18 +216,19 @@ class Admin(Generator):
 class RecordOwners(Generator):
     """Allows record owners."""
 
+    __slots__ = ()
+
     def needs(self, record=None, **kwargs):
         """Enabling Needs."""
-        return [UserNeed(owner) for owner in record.get('owners', [])]
+        return list(get_access_summary(record).owners)
 
-    def query_filter(self, record=None, **kwargs):
+    def query_filter(self, record=None, identity=None, **kwargs):
         """Filters for current identity as owner."""
         # TODO: Implement with new permissions metadata
-        provides = g.identity.provides
-        for need in provides:
-            if need.method == 'id':
-                return Q('term', owners=need.value)
-        return []
+        ids = provides_index(_identity(identity)).get('id')
+        if not ids:
+            return []
+        return _term_or_terms('owners', ids)
 
 
 class AnyUserIfPublic(Generator):
@@ -130,18 +237,13 @@ class AnyUserIfPublic(Generator):
     TODO: Revisit when dealing with files.
     """
 
+    __slots__ = ()
+
     def needs(self, record=None, **rest_over):
         """Enabling Needs."""
-        is_restricted = (
-            record and
-            record.get('_access', {}).get('metadata_restricted', False)
-        )
+        is_restricted = get_access_summary(record).restricted
         return [any_user] if not is_restricted else []
 
-    def excludes(self, record=None, **rest_over):
-        """Preventing Needs."""
-        return []
-
     def query_filter(self, *args, **kwargs):
         """Filters for non-restricted records."""
         # TODO: Implement with new permissions metadata
@@ -149,71 +251,72 @@ class AnyUserIfPublic(Generator):
 
 
 class AllowedByAccessLevel(Generator):
-    """Allows users/roles/groups that have an appropriate access level."""
+    """Allows users/roles/groups that have an appropriate access level.
+
+    The identities of the access levels are matched according to their
+    scheme (see ``invenio_records_permissions.access.SCHEME_TO_NEED``). The
+    search filter requires the ``internal.access_levels.<level>`` fields to
+    be mapped as ``nested``.
+    """
+
+    __slots__ = ('action', 'access_levels', 'read_fields')
 
-    # TODO: Implement other access levels:
-    # 'metadata_reader'
-    # 'files_reader'
-    # 'files_curator'
-    # 'admin'
     ACTION_TO_ACCESS_LEVELS = {
         'create': [],
-        'read': ['metadata_curator'],
-        'update': ['metadata_curator'],
-        'delete': []
+        'read': [
+            'metadata_reader', 'metadata_curator', 'files_reader',
+            'files_curator', 'admin'
+        ],
+        'update': ['metadata_curator', 'admin'],
+        'delete': ['admin'],
+        'read_files': ['files_reader', 'files_curator', 'admin'],
+        'update_files': ['files_curator', 'admin'],
     }
 
     def __init__(self, action='read'):
         """Constructor."""
         self.action = action
+        self.access_levels = tuple(
+            self.ACTION_TO_ACCESS_LEVELS.get(action, [])
+        )
+        # To get the record in the search results, the access level must
+        # have been put in the 'read' array
+        self.read_fields = tuple(
+            "internal.access_levels.{}".format(access_level)
+            for access_level in self.ACTION_TO_ACCESS_LEVELS.get('read', [])
+        )
 
     def needs(self, record=None, **kwargs):
-        """Enabling UserNeeds for each person."""
-        if not record:
-            return []
-
-        access_levels = AllowedByAccessLevel.ACTION_TO_ACCESS_LEVELS.get(
-            self.action, [])
-
-        # Name "identity" is used bc it correlates with flask-principal
-        # identity while not being one.
-        allowed_identities = chain.from_iterable([
-            record.get('internal', {})
-                  .get('access_levels', {})
-                  .get(access_level, [])
-            for access_level in access_levels
-        ])
-
-        return [
-            UserNeed(identity.get('id')) for identity in allowed_identities
-            if identity.get('scheme') == 'person' and identity.get('id')
-            # TODO: Implement other schemes
+        """Enabling Needs of the identities having the access levels."""
+        return get_access_summary(record).level_needs(self.access_levels)
+
+    def query_filter(self, identity=None, **kwargs):
+        """Search filter for the current user with this generator.
+
+        The ``scheme`` and ``id`` of an identity must match in the same
+        access level entry, so the access level fields must be mapped as
+        ``nested``: one nested clause per read access level, whatever the
+        number of Needs provided by the identity.
+        """
+        index = provides_index(_identity(identity))
+        methods = [
+            (schemes, index[method])
+            for method, schemes in sorted(METHOD_TO_SCHEMES.items())
+            if index.get(method)
         ]
-
-    def query_filter(self, *args, **kwargs):
-        """Search filter for the current user with this generator."""
-        id_need = next(
-            (need for need in g.identity.provides if need.method == 'id'),
-            None
-        )
-
-        if not id_need:
+        if not methods or not self.read_fields:
             return []
 
-        # To get the record in the search results, the access level must
-        # have been put in the 'read' array
-        read_levels = AllowedByAccessLevel.ACTION_TO_ACCESS_LEVELS.get(
-            'read', [])
-
         queries = [
-            Q('term', **{
-                "internal.access_levels.{}".format(access_level): {
-                    "scheme": "person", "id": id_need.value
-                    # TODO: Implement other schemes
-                }
-            }) for access_level in read_levels
+            Q('nested', path=field, query=reduce(operator.or_, [
+                Q('bool', filter=[
+                    _term_or_terms('{}.scheme'.format(field), schemes),
+                    _term_or_terms('{}.id'.format(field), values),
+                ])
+                for schemes, values in methods
+            ]))
+            for field in self.read_fields
         ]
-
         return reduce(operator.or_, queries)
 
 #
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+"""Permissions denormalized into the indexed records.
+
+When ``RECORDS_PERMISSIONS_INDEX_PERMISSIONS`` is enabled, the Needs allowed
+to perform each of ``RECORDS_PERMISSIONS_INDEXED_ACTIONS`` are written as
+tokens in the ``_permissions`` field of the indexed records, e.g.:
+
+.. code-block:: python
+
+    {'_permissions': {'read': ['any_user', 'id:5', 'role:admin']}}
+
+With ``RECORDS_PERMISSIONS_INDEXED_FILTER`` the search filter then becomes a
+single ``terms`` query on the tokens of the identity (see
+:func:`indexed_filter`). The field must be mapped as ``keyword``.
+"""
+
+from flask import current_app
+from invenio_access.permissions import any_user
+
+from .queries import Q
+
+INDEXED_FIELD = '_permissions'
+"""Field of the indexed records holding the permissions."""
+
+
+def need_token(need):
+    """Return the indexed token of a Need.
+
+    System roles (e.g. ``any_user``) are indexed by their value, other Needs
+    as ``<method>:<value>`` (e.g. ``id:5`` or ``role:admin``).
+    """
+    if need.method == 'system_role':
+        return need.value
+    return ':'.join(str(part) for part in need)
+
+
+def identity_tokens(identity):
+    """Return the sorted tokens of the Needs provided by an identity."""
+    return sorted({need_token(need) for need in identity.provides})
+
+
+def indexed_permissions(policy_cls, record, actions=('read',)):
+    """Return the indexed permissions of a record.
+
+    ActionNeeds aren't expanded: identities allowed through an action are
+    handled by the static generators at search time (see
+    :func:`indexed_filter`). An excluded Need is only removed as such (an
+    excluded ``any_user`` denies everyone).
+
+    :param policy_cls: The policy class.
+    :param record: The record being indexed.
+    :param actions: The actions to index.
+    :returns: A dict of action to the sorted list of tokens.
+    """
+    permissions = {}
+    for action in actions:
+        policy = policy_cls(action=action, record=record)
+        excludes = policy._generate('excludes', policy.over)
+        if any_user in excludes:
+            permissions[action] = []
+            continue
+        needs = policy._generate('needs', policy.over) - excludes
+        permissions[action] = sorted({need_token(n) for n in needs})
+    return permissions
+
+
+def indexed_filter(policy, identity):
+    """Search filter of a policy on the indexed permissions.
+
+    Identities decided by the static generators alone (e.g. super users)
+    match everything or nothing; the others need one of their tokens in the
+    indexed permissions of the policy action.
+
+    :param policy: The policy instance.
+    :param identity: The identity the filter is built for.
+    """
+    decision = policy._static_decision(set(identity.provides))
+    if decision is True:
+        return Q('match_all')
+    if decision is False:
+        return ~Q('match_all')
+    field = '{0}.{1}'.format(INDEXED_FIELD, policy.action)
+    return Q('terms', **{field: identity_tokens(identity)})
+
+
+def index_permissions(sender, json=None, record=None, **kwargs):
+    """Write the permissions of a record into its indexed document.
+
+    Receiver of invenio-indexer's ``before_record_index`` signal. The record
+    policy (see ``RECORDS_PERMISSIONS_RECORD_POLICY``) is used.
+    """
+    if json is None or record is None:
+        return
+    state = current_app.extensions['invenio-records-permissions']
+    json[INDEXED_FIELD] = indexed_permissions(
+        state.get_policy('records'),
+        record,
+        current_app.config['RECORDS_PERMISSIONS_INDEXED_ACTIONS'],
+    )
+
+
+def register_indexer_receiver(app):
+    """Connect :func:`index_permissions` to the indexing of records of app.
+
+    Requires invenio-indexer.
+    """
+    from invenio_indexer.signals import before_record_index
+    before_record_index.connect(index_permissions, sender=app)
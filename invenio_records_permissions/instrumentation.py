@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+"""Profiling of the policies and generators.
+
+When ``RECORDS_PERMISSIONS_PROFILING`` is enabled, the policies time the
+calls to the methods of their generators and the loading of their
+permissions. The statistics are available from the extension:
+
+.. code-block:: python
+
+    from invenio_records_permissions.proxies import current_records_permissions
+
+    current_records_permissions.stats()
+    # {'invenio_records_permissions.generators.RecordOwners.needs':
+    #     {'calls': 3, 'time': 0.0002, 'max_time': 0.0001, 'queries': 0},
+    #  ...}
+
+and each call is also sent as a signal (see
+:mod:`invenio_records_permissions.signals`).
+"""
+
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .signals import generator_evaluated, permissions_loaded
+
+_queries = threading.local()
+
+
+def _count_query(*args, **kwargs):
+    """Count a query executed by the current thread."""
+    _queries.count = getattr(_queries, 'count', 0) + 1
+
+
+def query_count():
+    """Return the number of queries executed so far by the current thread.
+
+    Queries are only counted once :func:`count_queries` was called.
+    """
+    return getattr(_queries, 'count', 0)
+
+
+def count_queries():
+    """Count the queries executed by all the SQLAlchemy engines."""
+    if not event.contains(Engine, 'before_cursor_execute', _count_query):
+        event.listen(Engine, 'before_cursor_execute', _count_query)
+
+
+def _path(obj):
+    """Return the import path of the class of an object."""
+    cls = obj.__class__
+    return '{0}.{1}'.format(cls.__module__, cls.__name__)
+
+
+class PermissionsProfiler(object):
+    """Statistics of the evaluation of the policies of an application."""
+
+    def __init__(self, app, timer=time.perf_counter):
+        """Constructor.
+
+        :param app: The Flask application, sender of the signals.
+        :param timer: Function returning the current time in seconds.
+        """
+        self.app = app
+        self.timer = timer
+        self._stats = {}
+        self._lock = threading.Lock()
+        count_queries()
+
+    def _record(self, key, duration, queries):
+        """Add a call to the statistics of ``key``."""
+        with self._lock:
+            stats = self._stats.setdefault(
+                key, {'calls': 0, 'time': 0.0, 'max_time': 0.0, 'queries': 0}
+            )
+            stats['calls'] += 1
+            stats['time'] += duration
+            stats['max_time'] = max(stats['max_time'], duration)
+            stats['queries'] += queries
+
+    def call(self, policy, generator, method, over):
+        """Call ``method`` of a generator over the objects and profile it."""
+        queries, start = query_count(), self.timer()
+        try:
+            return getattr(generator, method)(**over)
+        finally:
+            duration = self.timer() - start
+            queries = query_count() - queries
+            self._record(
+                '{0}.{1}'.format(_path(generator), method), duration, queries
+            )
+            if generator_evaluated.receivers:
+                generator_evaluated.send(
+                    self.app, policy=policy, generator=generator,
+                    method=method, duration=duration, queries=queries
+                )
+
+    def load_permissions(self, policy):
+        """Load the permissions of a policy and profile it."""
+        queries, start = query_count(), self.timer()
+        try:
+            return policy._load_permissions()
+        finally:
+            duration = self.timer() - start
+            queries = query_count() - queries
+            self._record(
+                '{0}._load_permissions'.format(_path(policy)),
+                duration, queries
+            )
+            if permissions_loaded.receivers:
+                permissions_loaded.send(
+                    self.app, policy=policy, duration=duration,
+                    queries=queries
+                )
+
+    def stats(self):
+        """Return a copy of the statistics.
+
+        :returns: A dict of ``<class path>.<method>`` to a dict of the
+            number of ``calls``, the total and maximum wall time (``time``
+            and ``max_time``, in seconds) and the number of ``queries``.
+        """
+        with self._lock:
+            return {key: dict(value) for key, value in self._stats.items()}
+
+    def reset(self):
+        """Forget the statistics."""
+        with self._lock:
+            self._stats.clear()
@@ -9,6 +9,6 @@
 
 """Invenio Records Permissions Policies."""
 
-from .base import BasePermissionPolicy
-from .deposits import DepositPermissionPolicy
+from .base import BasePermissionPolicy, PolicyEvaluator
+from .deposits import DepositPermissionPolicy, get_deposit_permission_policy
 from .records import RecordPermissionPolicy, get_record_permission_policy
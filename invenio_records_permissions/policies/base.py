@@ -9,12 +9,15 @@
 
 """Base access controls."""
 
+import asyncio
+from collections import namedtuple
 from itertools import chain
 
-from flask import current_app
+from flask import current_app, g, has_app_context
 from invenio_access import Permission
+from invenio_access.permissions import _P, superuser_access
 
-from ..generators import Disable
+from ..generators import Disable, Generator
 
 # Where can a property be used?
 #
@@ -35,6 +38,79 @@ from ..generators import Disable
 #
 
 
+class DecisionPlan(namedtuple('DecisionPlan', [
+        'generators', 'static_needs', 'static_excludes', 'dynamic',
+        'excluding'])):
+    """Precomputed evaluation of the generators of a policy action.
+
+    - ``generators``: all the generators of the action.
+    - ``static_needs``/``static_excludes``: Needs of the static generators,
+      computed once.
+    - ``dynamic``: the generators that need to be evaluated over the object.
+    - ``excluding``: whether any of the dynamic generators can exclude.
+    """
+
+    @classmethod
+    def compile(cls, generators):
+        """Build the plan of a list of generators."""
+        generators = tuple(generators)
+        static = [g for g in generators if g.static]
+        dynamic = tuple(g for g in generators if not g.static)
+        return cls(
+            generators=generators,
+            static_needs=frozenset(
+                chain.from_iterable(g.needs() for g in static)),
+            static_excludes=frozenset(
+                chain.from_iterable(g.excludes() for g in static)),
+            dynamic=dynamic,
+            excluding=any(
+                type(g).excludes is not Generator.excludes for g in dynamic
+            ),
+        )
+
+
+_DISABLED_PLAN = DecisionPlan.compile([Disable()])
+
+
+def _profiler():
+    """Return the profiler of the application, if profiling is enabled."""
+    if not has_app_context():
+        return None
+    state = current_app.extensions.get('invenio-records-permissions')
+    return state.profiler if state else None
+
+
+def _action_cache():
+    """Return the ActionNeed expansions cache of the application, if any.
+
+    Getting it installs the ``RECORDS_PERMISSIONS_ACTION_CACHE`` in
+    invenio-access if needed.
+    """
+    if not has_app_context():
+        return None
+    state = current_app.extensions.get('invenio-records-permissions')
+    return state.action_cache if state else None
+
+
+def _decision_cache():
+    """Return the decision cache of the application, if enabled."""
+    if not has_app_context():
+        return None
+    state = current_app.extensions.get('invenio-records-permissions')
+    return state.decision_cache if state else None
+
+
+def _evaluations():
+    """Return the policy evaluations memoized in the application context.
+
+    ``None`` is returned outside of an application context, in which case
+    nothing is memoized.
+    """
+    if not has_app_context():
+        return None
+    return g.setdefault('_records_permissions_evaluations', {})
+
+
 class BasePermissionPolicy(Permission):
     """
     BasePermissionPolicy to inherit from.
@@ -56,11 +132,50 @@ class BasePermissionPolicy(Permission):
     can_update = []
     can_delete = []
 
+    def __init_subclass__(cls, **kwargs):
+        """Compile the decision plans of the new policy."""
+        super(BasePermissionPolicy, cls).__init_subclass__(**kwargs)
+        cls._compile_plans()
+
     def __init__(self, action, **over):
         """Constructor."""
         super(BasePermissionPolicy, self).__init__()
+        self.explicit_needs = frozenset(self.explicit_needs)
+        self.explicit_excludes = frozenset(self.explicit_excludes)
         self.action = action
         self.over = over
+        self._action_expansions = {}
+
+    @classmethod
+    def _compile_plans(cls):
+        """Compile the decision plan of every ``can_<action>``."""
+        cls._plans = {}
+        for name in dir(cls):
+            if name.startswith('can_'):
+                cls.get_plan(name[len('can_'):])
+
+    @classmethod
+    def get_plan(cls, action):
+        """Return the :class:`DecisionPlan` of an action.
+
+        Plans are compiled at class creation. An action whose generators
+        were replaced or changed in place afterwards is compiled again.
+        """
+        generators = getattr(cls, 'can_' + action, None)
+        if generators is None:
+            return _DISABLED_PLAN
+
+        generators = tuple(generators)
+        source, plan = cls._plans.get(action, (None, None))
+        if source != generators:
+            plan = DecisionPlan.compile(generators)
+            cls._plans[action] = (generators, plan)
+        return plan
+
+    @property
+    def plan(self):
+        """:class:`DecisionPlan` for self.action."""
+        return self.get_plan(self.action)
 
     @property
     def generators(self):
@@ -68,7 +183,392 @@ class BasePermissionPolicy(Permission):
 
         Defaults to Disable() if no can_<self.action> defined.
         """
-        return getattr(self.__class__, 'can_' + self.action, [Disable()])
+        return self.plan.generators
+
+    def _evaluation_key(self):
+        """Key identifying the evaluation of this policy.
+
+        Only evaluations over a stored record (identified by its id and
+        revision) or over no object at all are keyed, anything else is
+        evaluated every time.
+        """
+        if set(self.over) - {'record'}:
+            return None
+
+        record = self.over.get('record')
+        if record is None:
+            return (self.__class__, self.action, None, None)
+
+        record_id = getattr(record, 'id', None)
+        revision_id = getattr(record, 'revision_id', None)
+        if record_id is None or revision_id is None:
+            return None
+        return (self.__class__, self.action, str(record_id), revision_id)
+
+    def _memoized_permissions(self):
+        """Return the memoized evaluation of this policy, if any."""
+        if self._permissions is None:
+            key = self._evaluation_key()
+            evaluations = _evaluations() if key else None
+            if evaluations:
+                self._permissions = evaluations.get(key)
+        return self._permissions
+
+    def _load_policy_permissions(self):
+        """Evaluate the generators and expand their Needs.
+
+        The result is memoized on the instance and, when the policy can be
+        keyed (see ``_evaluation_key``), in the current application context
+        so that further policies for the same action over the same record
+        revision don't evaluate the generators again.
+        """
+        permissions = self._memoized_permissions()
+        if permissions is not None:
+            return permissions
+
+        profiler = _profiler()
+        if profiler is None:
+            self._load_permissions()
+        else:
+            profiler.load_permissions(self)
+
+        key = self._evaluation_key()
+        evaluations = _evaluations() if key else None
+        if evaluations is not None:
+            evaluations[key] = self._permissions
+        return self._permissions
+
+    def _generate(self, method, over):
+        """Return the set of Needs produced by ``method`` of the generators.
+
+        Only the dynamic generators are evaluated, the Needs of the static
+        ones come from the plan.
+
+        :param method: ``'needs'`` or ``'excludes'``.
+        :param over: The objects the generators are evaluated over.
+        """
+        plan = self.plan
+        static = plan.static_needs if method == 'needs' \
+            else plan.static_excludes
+        return static.union(chain.from_iterable(
+            self._evaluate(plan.dynamic, method, over)
+        ))
+
+    def _evaluate(self, generators, method, over):
+        """Yield the result of ``method`` of each generator, lazily.
+
+        The calls are profiled when ``RECORDS_PERMISSIONS_PROFILING`` is
+        enabled.
+        """
+        profiler = _profiler()
+        for generator in generators:
+            if profiler is None:
+                yield getattr(generator, method)(**over)
+            else:
+                yield profiler.call(self, generator, method, over)
+
+    def _load_permissions(self):
+        """Load permissions for all needs, expanding actions.
+
+        The Needs of the generators are added to the explicit ones without
+        modifying them, so that an instance can be evaluated by several
+        threads.
+        """
+        self._permissions = self._resolve(
+            self.explicit_needs | self._generate('needs', self.over),
+            self.explicit_excludes | self._generate('excludes', self.over),
+        )
+
+    def _resolve(self, explicit_needs, explicit_excludes, partial=False):
+        """Expand ActionNeeds into the Users/Roles that provide them.
+
+        Same as ``Permission._load_permissions()`` but over the given Needs
+        and with the expansions memoized on the instance, so that evaluations
+        sharing an instance (see ``bulk_allows``) share the expansions.
+
+        :param partial: Whether the Needs are only part of the policy's, in
+            which case an empty result isn't turned into a denial.
+        :returns: The expanded needs and excludes, as frozensets.
+        """
+        result = _P(needs=set(), excludes=set())
+
+        action_needs, needs = self._split_actionsneeds(explicit_needs)
+        action_excludes, excludes = self._split_actionsneeds(
+            explicit_excludes
+        )
+        result.needs.update(needs)
+        result.excludes.update(excludes)
+
+        for need in action_needs | action_excludes:
+            result.update(self._expand_action(need))
+
+        # Deny access when no one provides the needs (see invenio-access)
+        if not result.needs and not self.allow_by_default and not partial:
+            result.needs.update(action_needs)
+
+        return _P(
+            needs=frozenset(result.needs), excludes=frozenset(result.excludes)
+        )
+
+    def _expand_action(self, explicit_action):
+        """Expand action to user/roles needs and excludes.
+
+        Expansions are memoized on the instance. Across instances, they are
+        cached by invenio-access (see ``RECORDS_PERMISSIONS_ACTION_CACHE``).
+        """
+        expansion = self._action_expansions.get(explicit_action)
+        if expansion is None:
+            _action_cache()
+            expansion = super(BasePermissionPolicy, self)._expand_action(
+                explicit_action
+            )
+            self._action_expansions[explicit_action] = expansion
+        return expansion
+
+    @staticmethod
+    def _permits(permissions, provides):
+        """Whether ``provides`` satisfies the expanded ``permissions``.
+
+        Same decision as ``flask_principal.Permission.allows``.
+        """
+        if permissions.needs and permissions.needs.isdisjoint(provides):
+            return False
+        if permissions.excludes and \
+                not permissions.excludes.isdisjoint(provides):
+            return False
+        return True
+
+    def _resolve_static(self):
+        """Expand the Needs of the static generators (and superuser)."""
+        plan = self.plan
+        return self._resolve(
+            plan.static_needs | {superuser_access},
+            plan.static_excludes,
+            partial=True,
+        )
+
+    def _static_decision(self, provides, static=None):
+        """Decide from the static generators only, if possible.
+
+        - Denied if the identity provides an excluded Need, since excludes
+          only grow with the dynamic generators.
+        - Allowed if it provides a needed Need and none of the dynamic
+          generators can exclude.
+
+        :param static: The expanded static Needs, if already resolved.
+        :returns: ``True``, ``False`` or ``None`` when undecided.
+        """
+        static = static or self._resolve_static()
+        if not static.excludes.isdisjoint(provides):
+            return False
+        if not self.plan.excluding and not static.needs.isdisjoint(provides):
+            return True
+        return None
+
+    lazy_allows = True
+    """Whether ``allows`` evaluates the generators lazily.
+
+    When disabled, ``allows`` materializes ``needs`` and ``excludes`` like
+    ``Permission.allows`` does.
+    """
+
+    def allows(self, identity):
+        """Whether the identity can perform the action.
+
+        When ``RECORDS_PERMISSIONS_DECISION_CACHE`` is enabled, the decisions
+        of keyed evaluations (see ``_evaluation_key``) are cached across
+        requests per fingerprint of the Needs of the identity.
+
+        :param identity: The ``flask_principal.Identity`` to check.
+        """
+        cache = _decision_cache()
+        key = self._evaluation_key() if cache is not None else None
+        if key is None:
+            return self._decide(identity)
+
+        cache_key = cache.key(key, identity)
+        decision = cache.get(cache_key)
+        if decision is None:
+            decision = self._decide(identity)
+            cache.set(cache_key, decision)
+        return decision
+
+    def _decide(self, identity):
+        """Decide whether the identity can perform the action.
+
+        The static generators are checked first (see ``_static_decision``),
+        then the excludes of the dynamic generators and finally their needs,
+        one generator at a time, stopping at the first match. Already
+        materialized (or memoized) ``needs`` and ``excludes`` are used when
+        available.
+
+        .. note::
+
+            Excludes coming from the expansion of ActionNeeds returned by
+            the ``needs`` of a generator are only honored if that generator
+            is evaluated. Policies relying on them should set
+            ``lazy_allows = False``.
+
+        :param identity: The ``flask_principal.Identity`` to check.
+        """
+        provides = identity.provides
+        if not self.lazy_allows or self._memoized_permissions() is not None:
+            return self._permits(self._load_policy_permissions(), provides)
+
+        static = self._resolve_static()
+        decision = self._static_decision(provides, static)
+        if decision is not None:
+            return decision
+
+        dynamic = self.plan.dynamic
+        matched_needs = bool(static.needs)
+        if self.plan.excluding:
+            for generator_excludes in self._evaluate(
+                    dynamic, 'excludes', self.over):
+                excludes = self._resolve((), generator_excludes, partial=True)
+                if not excludes.excludes.isdisjoint(provides):
+                    return False
+                matched_needs = matched_needs or bool(excludes.needs)
+            if not static.needs.isdisjoint(provides):
+                return True
+
+        action_needs = {
+            need for need in self.plan.static_needs if need.method == 'action'
+        }
+        action_needs.add(superuser_access)
+        for needs in self._evaluate(dynamic, 'needs', self.over):
+            needs = set(needs)
+            permissions = self._resolve(needs, (), partial=True)
+            if not permissions.excludes.isdisjoint(provides):
+                return False
+            if not permissions.needs.isdisjoint(provides):
+                return True
+            matched_needs = matched_needs or bool(permissions.needs)
+            action_needs.update(n for n in needs if n.method == 'action')
+
+        # Nobody provides the needs: allowed by default, or only the
+        # ActionNeeds themselves are required (see ``_resolve``)
+        if not matched_needs:
+            if self.allow_by_default:
+                return True
+            return not action_needs.isdisjoint(provides)
+        return False
+
+    @classmethod
+    def bulk_allows(cls, action, records, identity, **over):
+        """Whether the identity can perform the action on each record.
+
+        A single policy instance evaluates the generators over every record
+        and the ActionNeeds are expanded once for the whole batch.
+
+        :param action: The action to check.
+        :param records: An iterable of records.
+        :param identity: The ``flask_principal.Identity`` to check.
+        :param over: Other objects the generators are evaluated over.
+        :returns: A list of booleans, one per record, in order.
+        """
+        evaluator = PolicyEvaluator(cls, action, identity, **over)
+        return [evaluator.allows(record) for record in records]
+
+    async def _async_generate(self, method, over):
+        """Asynchronous ``_generate``: the generators are awaited together.
+
+        :param method: ``'needs'`` or ``'excludes'``.
+        :param over: The objects the generators are evaluated over.
+        """
+        plan = self.plan
+        static = plan.static_needs if method == 'needs' \
+            else plan.static_excludes
+        results = await asyncio.gather(*[
+            getattr(generator, 'async_' + method)(**over)
+            for generator in plan.dynamic
+        ])
+        return static.union(chain.from_iterable(results))
+
+    async def async_load_permissions(self, app=None):
+        """Evaluate the generators and expand their Needs asynchronously.
+
+        The generators are awaited concurrently (see
+        ``Generator.async_needs``) and the ActionNeeds are expanded in the
+        default executor of the event loop, within an application context,
+        so that the database queries don't block the loop. The result is
+        only memoized on the instance.
+
+        :param app: The Flask application. Defaults to the current one.
+        :returns: The expanded needs and excludes.
+        """
+        if self._permissions is not None:
+            return self._permissions
+
+        needs, excludes = await asyncio.gather(
+            self._async_generate('needs', self.over),
+            self._async_generate('excludes', self.over),
+        )
+        app = app or current_app._get_current_object()
+
+        def resolve():
+            with app.app_context():
+                return self._resolve(
+                    self.explicit_needs | needs,
+                    self.explicit_excludes | excludes,
+                )
+
+        # The running loop, also on Python 3.6
+        loop = asyncio.get_event_loop()
+        self._permissions = await loop.run_in_executor(None, resolve)
+        return self._permissions
+
+    async def async_needs(self, app=None):
+        """Set of Needs granting permission, evaluated asynchronously.
+
+        :param app: The Flask application. Defaults to the current one.
+        """
+        return (await self.async_load_permissions(app)).needs
+
+    async def async_excludes(self, app=None):
+        """Set of Needs denying permission, evaluated asynchronously.
+
+        :param app: The Flask application. Defaults to the current one.
+        """
+        return (await self.async_load_permissions(app)).excludes
+
+    async def async_can(self, identity, app=None):
+        """Whether the identity can perform the action, asynchronously.
+
+        Unlike ``can()``, the identity and the application are explicit, so
+        that checks can run outside of a request, e.g. concurrently:
+
+        .. code-block:: python
+
+            await asyncio.gather(*[
+                policy(action='read', record=record).async_can(identity, app)
+                for record in records
+            ])
+
+        :param identity: The ``flask_principal.Identity`` to check.
+        :param app: The Flask application. Defaults to the current one.
+        """
+        permissions = await self.async_load_permissions(app)
+        return self._permits(permissions, identity.provides)
+
+    @classmethod
+    def invalidate(cls, record=None):
+        """Forget the evaluations memoized in the application context.
+
+        :param record: If given, only the evaluations over this record are
+            forgotten. Otherwise all evaluations of this policy are.
+        """
+        evaluations = _evaluations()
+        if not evaluations:
+            return
+
+        record_id = getattr(record, 'id', None)
+        for key in list(evaluations):
+            policy_cls, _, key_record_id, _ = key
+            if not issubclass(policy_cls, cls):
+                continue
+            if record is None or key_record_id == str(record_id):
+                del evaluations[key]
 
     @property
     def needs(self):
@@ -84,13 +584,11 @@ class BasePermissionPolicy(Permission):
             ``superuser_access`` Need (if tied to a User or Role) for us.
             It also expands ActionNeeds into the Users/Roles that
             provide them.
+
+        The evaluation is shared with ``excludes`` and memoized (see
+        ``_load_policy_permissions``).
         """
-        needs = [
-            generator.needs(**self.over) for generator in self.generators
-        ]
-        self.explicit_needs |= set(chain.from_iterable(needs))
-        self._load_permissions()  # self.explicit_needs is used here
-        return self._permissions.needs
+        return self._load_policy_permissions().needs
 
     @property
     def excludes(self):
@@ -110,12 +608,7 @@ class BasePermissionPolicy(Permission):
         If the same Need is returned by `needs` and `excludes`, then that
         Need provider is disallowed.
         """
-        excludes = [
-            generator.excludes(**self.over) for generator in self.generators
-        ]
-        self.explicit_excludes |= set(chain.from_iterable(excludes))
-        self._load_permissions()  # self.explicit_excludes is used here
-        return self._permissions.excludes
+        return self._load_policy_permissions().excludes
 
     @property
     def query_filters(self):
@@ -124,8 +617,72 @@ class BasePermissionPolicy(Permission):
         These filters consist of additive queries mapping to what the current
         user should be able to retrieve via search.
         """
-        filters = [
-            generator.query_filter(**self.over)
-            for generator in self.generators
-        ]
+        return self.get_query_filters()
+
+    def get_query_filters(self, identity=None):
+        """List of ElasticSearch query filters for an identity.
+
+        Unlike ``query_filters``, it doesn't need a request context when an
+        identity is given, e.g. to build filters in background workers.
+
+        :param identity: The identity searching. Defaults to ``g.identity``.
+        """
+        over = self.over if identity is None \
+            else dict(self.over, identity=identity)
+        filters = self._evaluate(self.generators, 'query_filter', over)
         return [f for f in filters if f]
+
+
+BasePermissionPolicy._compile_plans()
+
+
+class PolicyEvaluator(object):
+    """Compact evaluation of a policy action by an identity over records.
+
+    A single policy instance is created for the whole evaluator: checking a
+    record only evaluates the dynamic generators over it and expands the
+    memoized ActionNeeds. Decisions are the ones of the policy with
+    materialized Needs (``lazy_allows = False``):
+
+    .. code-block:: python
+
+        evaluator = PolicyEvaluator(RecordPermissionPolicy, 'read', identity)
+        hits = [hit for hit in hits if evaluator.allows(hit)]
+
+    Evaluations are neither memoized per request nor profiled.
+    """
+
+    __slots__ = ('policy', 'provides', 'over', 'decision')
+
+    def __init__(self, policy_cls, action, identity, **over):
+        """Constructor.
+
+        :param policy_cls: The policy class.
+        :param action: The action to check.
+        :param identity: The ``flask_principal.Identity`` to check.
+        :param over: Other objects the generators are evaluated over.
+        """
+        self.policy = policy_cls(action=action, **over)
+        self.provides = frozenset(identity.provides)
+        self.over = over
+        self.decision = self.policy._static_decision(self.provides)
+
+    def allows(self, record):
+        """Whether the identity can perform the action over the record."""
+        if self.decision is not None:
+            return self.decision
+
+        policy = self.policy
+        over = dict(self.over, record=record)
+        plan = policy.plan
+        needs = chain.from_iterable(
+            generator.needs(**over) for generator in plan.dynamic
+        )
+        excludes = chain.from_iterable(
+            generator.excludes(**over) for generator in plan.dynamic
+        )
+        permissions = policy._resolve(
+            policy.explicit_needs.union(plan.static_needs, needs),
+            policy.explicit_excludes.union(plan.static_excludes, excludes),
+        )
+        return policy._permits(permissions, self.provides)
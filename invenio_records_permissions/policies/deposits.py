@@ -14,11 +14,13 @@
 - Read access given to deposit owners.
 - Update access given to deposit owners.
 - Delete access given to admins only.
-- Use same "get_permission_policy" pattern as records.py
 """
 
+from flask import current_app
+
 from ..generators import AnyUser, RecordOwners
 from .base import BasePermissionPolicy
+from .records import obj_or_import_string
 
 
 class DepositPermissionPolicy(BasePermissionPolicy):
@@ -29,3 +31,18 @@ class DepositPermissionPolicy(BasePermissionPolicy):
     can_read = [RecordOwners()]
     can_update = []
     can_delete = []
+
+
+def get_deposit_permission_policy():
+    """Return DepositPermissionPolicy.
+
+    Relies on ``RECORDS_PERMISSIONS_DEPOSIT_POLICY``, resolved once per
+    application by the extension like ``get_record_permission_policy``.
+    """
+    state = current_app.extensions.get('invenio-records-permissions')
+    if state is not None:
+        return state.get_policy('deposits')
+    return obj_or_import_string(
+        current_app.config.get('RECORDS_PERMISSIONS_DEPOSIT_POLICY'),
+        default=DepositPermissionPolicy
+    )
@@ -80,7 +80,13 @@ def get_record_permission_policy():
     Relies on ``RECORDS_PERMISSIONS_RECORD_POLICY`` to
     automatically configure functionality. This way the hoster doesn't need to
     define their own CRUD factories (functions) anymore.
+
+    The policy is resolved once per application by the extension (see
+    ``reload_policies`` to resolve it again).
     """
+    state = current_app.extensions.get('invenio-records-permissions')
+    if state is not None:
+        return state.get_policy('records')
     return obj_or_import_string(
         current_app.config.get('RECORDS_PERMISSIONS_RECORD_POLICY'),
         default=RecordPermissionPolicy
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+"""Post-filtering of search hits by a policy.
+
+The search filter of a policy only covers the generators implementing
+``query_filter``. When a dynamic generator of the action doesn't (see
+:func:`unfiltered_generators`), the search can't be filtered without
+dropping hits the policy allows. A :class:`PostFilter` then leaves the
+search unfiltered and checks the hits instead, in batches, with a single
+:class:`invenio_records_permissions.policies.PolicyEvaluator`:
+
+.. code-block:: python
+
+    post_filter = PostFilter(RecordPermissionPolicy(action='read'))
+    hits = post_filter.window(RecordsSearch(), start=20, size=10)
+    post_filter.filtered  # Number of hits denied so far
+
+Identities decided by the static generators alone (e.g. super users) match
+everything or nothing, without any post-filtering.
+
+The totals and aggregations of a widened search would count the hits the
+policy denies. Aggregations are thus refused on it (see
+:meth:`PostFilter.apply`) and its hits must be counted with
+:meth:`PostFilter.count` instead of the total of the search response.
+"""
+
+from itertools import islice
+
+from flask import g
+
+from .api import policy_filter
+from .errors import PostFilteringError
+from .generators import Generator
+from .policies import PolicyEvaluator
+from .queries import Q
+
+
+def unfiltered_generators(policy):
+    """Return the dynamic generators of a policy action lacking a filter.
+
+    :param policy: The policy instance.
+    """
+    return [
+        generator for generator in policy.plan.dynamic
+        if type(generator).query_filter is Generator.query_filter
+    ]
+
+
+def _batches(iterable, size):
+    """Yield lists of ``size`` items of an iterable (the last one shorter)."""
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+def _source(hit):
+    """Return the record of a search hit."""
+    return hit.to_dict() if hasattr(hit, 'to_dict') else hit
+
+
+class PostFilter(object):
+    """Permission filter of searches, with a post-filter fallback.
+
+    :attr:`checked` and :attr:`filtered` count the hits checked and denied
+    by the post-filter.
+    """
+
+    def __init__(self, policy, identity=None, batch_size=100):
+        """Constructor.
+
+        :param policy: The policy instance (e.g. for the ``read`` action).
+        :param identity: The identity searching. Defaults to ``g.identity``.
+        :param batch_size: Number of hits fetched and checked at once.
+        """
+        self.policy = policy
+        self.identity = identity or g.identity
+        self.batch_size = batch_size
+        over = {k: v for k, v in policy.over.items() if k != 'record'}
+        self.evaluator = PolicyEvaluator(
+            type(policy), policy.action, self.identity, **over
+        )
+        self.post_filtering = self.evaluator.decision is None and \
+            bool(unfiltered_generators(policy))
+        self.checked = 0
+        self.filtered = 0
+
+    def apply(self, search):
+        """Filter an ``elasticsearch_dsl`` search.
+
+        The search is left unfiltered when its hits need post-filtering. Its
+        hit total then counts the denied hits too (see :meth:`count`).
+
+        :raises PostFilteringError: If the search has aggregations and its
+            hits need post-filtering.
+        """
+        decision = self.evaluator.decision
+        if self.post_filtering:
+            if search.aggs.to_dict():
+                raise PostFilteringError(
+                    'Aggregations would count the denied hits.'
+                )
+            return search
+        if decision is True:
+            return search
+        if decision is False:
+            return search.filter(~Q('match_all'))
+        return search.filter(policy_filter(self.policy, self.identity))
+
+    def filter_hits(self, hits):
+        """Yield the allowed hits, checking them in batches.
+
+        :param hits: An iterable of hits (``Hit`` objects or records).
+        """
+        if not self.post_filtering:
+            for hit in hits:
+                yield hit
+            return
+
+        for batch in _batches(hits, self.batch_size):
+            decisions = [self.evaluator.allows(_source(hit)) for hit in batch]
+            self.checked += len(batch)
+            self.filtered += decisions.count(False)
+            for hit, allowed in zip(batch, decisions):
+                if allowed:
+                    yield hit
+
+    def scan(self, search):
+        """Yield the hits of a search, fetching one page per batch.
+
+        The pages are limited by the ``index.max_result_window`` of the
+        index.
+        """
+        start = 0
+        while True:
+            page = list(search[start:start + self.batch_size].execute())
+            for hit in page:
+                yield hit
+            if len(page) < self.batch_size:
+                return
+            start += self.batch_size
+
+    def count(self, search):
+        """Return the number of allowed hits of a search.
+
+        Without post-filtering, this is the count of the filtered search.
+        Otherwise all the hits are fetched and post-filtered.
+        """
+        search = self.apply(search)
+        if not self.post_filtering:
+            return search.count()
+        return sum(1 for _ in self.filter_hits(self.scan(search)))
+
+    def window(self, search, start=0, size=10):
+        """Return the allowed hits ``[start:start + size]`` of a search.
+
+        Without post-filtering, this is a single filtered search. Otherwise
+        the pages of hits are fetched and post-filtered until the window is
+        full (or the hits exhausted).
+        """
+        search = self.apply(search)
+        if not self.post_filtering:
+            return list(search[start:start + size].execute())
+        return list(islice(
+            self.filter_hits(self.scan(search)), start, start + size
+        ))
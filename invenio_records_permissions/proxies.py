@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+"""Proxy definitions."""
+
+from flask import current_app
+from werkzeug.local import LocalProxy
+
+current_records_permissions = LocalProxy(
+    lambda: current_app.extensions['invenio-records-permissions']
+)
+"""Proxy to the state of the Invenio-Records-Permissions extension."""
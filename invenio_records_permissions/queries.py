@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+"""Search filters optimization.
+
+elasticsearch_dsl is only imported once a query is built (see :func:`Q`), so
+that importing the generators and policies doesn't load it.
+"""
+
+import json
+from collections import OrderedDict
+
+MATCH_NONE = (
+    # ES 6-
+    {'bool': {'must_not': [{'match_all': {}}]}},
+    # ES 7+
+    {'match_none': {}},
+)
+
+
+def Q(*args, **kwargs):
+    """Build an ``elasticsearch_dsl`` query, see ``elasticsearch_dsl.Q``."""
+    from elasticsearch_dsl.query import Q as _Q
+    return _Q(*args, **kwargs)
+
+
+def _field_values(clause):
+    """Return ``(field, values)`` of a plain term(s) clause, else ``None``.
+
+    Only single-field clauses on scalar values (no ``boost``, no object
+    values) can be merged.
+    """
+    if len(clause) != 1:
+        return None
+    kind, params = next(iter(clause.items()))
+    if kind not in ('term', 'terms') or len(params) != 1:
+        return None
+    field, values = next(iter(params.items()))
+    values = values if kind == 'terms' else [values]
+    if not isinstance(values, list) or \
+            any(isinstance(v, (dict, list)) for v in values):
+        return None
+    return field, values
+
+
+def simplify_filters(filters):
+    """OR query filters together into a minimal query.
+
+    - ``match_all`` makes the whole filter ``match_all``;
+    - match none clauses are dropped (no clause left gives match none);
+    - ``term``/``terms`` clauses on the same field are merged into a single
+      ``terms`` clause;
+    - identical clauses are only kept once.
+
+    The result is a single clause or a ``bool`` query of ``should`` clauses
+    (for use in filter context, e.g. as default filter).
+
+    :param filters: Iterable of ``Q`` objects or query dicts.
+    :returns: A ``Q`` object.
+    """
+    fields = OrderedDict()
+    clauses = OrderedDict()
+
+    for query in filters:
+        clause = query.to_dict() if hasattr(query, 'to_dict') else query
+        if clause == {'match_all': {}}:
+            return Q('match_all')
+        if clause in MATCH_NONE:
+            continue
+
+        field_values = _field_values(clause)
+        if field_values:
+            field, values = field_values
+            merged = fields.setdefault(field, [])
+            merged.extend(v for v in values if v not in merged)
+            clauses.setdefault(('field', field), None)
+        else:
+            clauses.setdefault(json.dumps(clause, sort_keys=True), clause)
+
+    result = []
+    for key, clause in clauses.items():
+        if clause is None:
+            field = key[1]
+            values = fields[field]
+            clause = {'term': {field: values[0]}} if len(values) == 1 \
+                else {'terms': {field: values}}
+        result.append(clause)
+
+    if not result:
+        return ~Q('match_all')
+    if len(result) == 1:
+        return Q(result[0])
+    return Q('bool', should=[Q(c) for c in result], minimum_should_match=1)
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+"""Receivers keeping the caches consistent with the database.
+
+The evaluations memoized in the application context (see
+``BasePermissionPolicy.invalidate``), the cached decisions and the cached
+search filters are forgotten when actions are granted or revoked and when
+roles change, and again if the transaction of these changes is rolled back,
+together with the expansions cached by invenio-access.
+"""
+
+import sys
+
+from flask import current_app, has_app_context
+from invenio_access.models import ActionRoles, ActionSystemRoles, \
+    ActionUsers, get_action_cache_key
+from invenio_access.proxies import current_access
+from invenio_accounts.models import Role, User
+from sqlalchemy import event, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm.attributes import get_history
+
+from .policies import BasePermissionPolicy
+
+CHANGED_ACTIONS = 'invenio-records-permissions:changed-actions'
+"""Key of the cache keys of the changed actions in ``Connection.info``."""
+
+
+def _current_state():
+    """Return the extension state of the current application, if any."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('invenio-records-permissions')
+
+
+def _invalidate_decisions(state):
+    """Forget the cached decisions of the policies."""
+    if state is not None and state.decision_cache is not None:
+        state.decision_cache.invalidate()
+
+
+def _invalidate_filters(state):
+    """Forget the cached search filters.
+
+    Identities decided by the static generators (e.g. super users) get
+    filters depending on the granted actions.
+    """
+    if state is not None and state.filter_cache is not None:
+        state.filter_cache.clear()
+
+
+def _invalidate(state, connection, action_keys):
+    """Forget everything depending on the changed actions.
+
+    The cache keys of the actions are kept with the connection until the
+    end of its transaction (see :func:`rolled_back`).
+    """
+    BasePermissionPolicy.invalidate()
+    _invalidate_decisions(state)
+    _invalidate_filters(state)
+    connection.info.setdefault(CHANGED_ACTIONS, set()).update(action_keys)
+
+
+def changed_action(mapper, connection, target):
+    """Forget the evaluations and decisions when an action changes.
+
+    invenio-access forgets the cached expansion of the action itself.
+    """
+    state = _current_state()
+    if state is None:
+        return
+    keys = {get_action_cache_key(target.action, target.argument)}
+    action = get_history(target, 'action').deleted
+    argument = get_history(target, 'argument').deleted
+    if action or argument:
+        keys.add(get_action_cache_key(
+            action[0] if action else target.action,
+            argument[0] if argument else target.argument,
+        ))
+    _invalidate(state, connection, keys)
+
+
+def _forget_role_actions(connection, role_id):
+    """Forget the cached expansions of the actions granted to a role.
+
+    :returns: The cache keys of the actions.
+    """
+    actions = ActionRoles.__table__.c
+    rows = connection.execute(
+        select([actions.action, actions.argument]).where(
+            actions.role_id == role_id)
+    )
+    keys = {get_action_cache_key(action, arg) for action, arg in rows}
+    for key in keys:
+        current_access.delete_action_cache(key)
+    return keys
+
+
+def renamed_role(mapper, connection, target):
+    """Forget the cached expansions of the actions of a renamed role.
+
+    The Need of a role is its name, which invenio-access doesn't watch.
+    """
+    state = _current_state()
+    if state is None or not get_history(target, 'name').has_changes():
+        return
+    _invalidate(state, connection, _forget_role_actions(connection, target.id))
+
+
+def deleted_role(mapper, connection, target):
+    """Forget the cached expansions of the actions of a deleted role."""
+    state = _current_state()
+    if state is None:
+        return
+    _invalidate(state, connection, _forget_role_actions(connection, target.id))
+
+
+def _forget_changed_actions(action_keys):
+    """Forget everything depending on actions whose changes were undone."""
+    state = _current_state()
+    if not action_keys or state is None:
+        return
+    for key in action_keys:
+        current_access.delete_action_cache(key)
+    BasePermissionPolicy.invalidate()
+    _invalidate_decisions(state)
+    _invalidate_filters(state)
+
+
+def rolled_back(connection):
+    """Forget the caches filled from the changes of a rolled back transaction.
+
+    The expansions, evaluations and decisions computed between the changes
+    and the rollback reflect changes which didn't happen.
+    """
+    _forget_changed_actions(connection.info.pop(CHANGED_ACTIONS, None))
+
+
+def rolled_back_savepoint(connection, name, context):
+    """Forget the caches filled from the changes of a rolled back savepoint.
+
+    The changed actions are kept until the end of the whole transaction.
+    """
+    _forget_changed_actions(connection.info.get(CHANGED_ACTIONS))
+
+
+def committed(connection):
+    """Forget the changed actions of a committed transaction."""
+    connection.info.pop(CHANGED_ACTIONS, None)
+
+
+def changed_role_membership(target, value, initiator):
+    """Forget the cached decisions when a user joins or leaves a role.
+
+    The decisions are keyed on the Needs of the identities, but these are
+    only reloaded on the next login of the user.
+    """
+    _invalidate_decisions(_current_state())
+
+
+def changed_record(sender, record=None, **kwargs):
+    """Forget the evaluations memoized over a record which changed.
+
+    Receiver of the invenio-records signals. The cached decisions don't need
+    to be invalidated, as they are keyed on the record revision.
+    """
+    if record is not None:
+        BasePermissionPolicy.invalidate(record=record)
+
+
+def changed_records_buckets(mapper, connection, target):
+    """Forget the cached record of a bucket whose relationship changed."""
+    from .resolvers import forget_bucket
+
+    if not has_app_context():
+        return
+    history = get_history(target, 'bucket_id')
+    for bucket_id in set(history.deleted or ()) | {target.bucket_id}:
+        if bucket_id is not None:
+            forget_bucket(bucket_id)
+
+
+RECEIVERS = [
+    (model, identifier, changed_action)
+    for model in (ActionUsers, ActionRoles, ActionSystemRoles)
+    for identifier in ('after_insert', 'after_delete', 'after_update')
+] + [
+    (Role, 'after_update', renamed_role),
+    (Role, 'before_delete', deleted_role),
+    (User.roles, 'append', changed_role_membership),
+    (User.roles, 'remove', changed_role_membership),
+    (Engine, 'rollback', rolled_back),
+    (Engine, 'rollback_savepoint', rolled_back_savepoint),
+    (Engine, 'commit', committed),
+]
+
+
+def _listen(receivers):
+    """Connect SQLAlchemy event receivers, unless already connected."""
+    for model, identifier, receiver in receivers:
+        if not event.contains(model, identifier, receiver):
+            event.listen(model, identifier, receiver)
+
+
+def register_files_receivers():
+    """Connect the receivers (once) to the files stack models.
+
+    The files stack is only imported by the bucket resolvers (see
+    :mod:`invenio_records_permissions.resolvers`), which connect these
+    receivers when they are first imported, or by
+    :func:`register_receivers` if it is already loaded.
+    """
+    from invenio_records_files.models import RecordsBuckets
+    _listen(
+        (RecordsBuckets, identifier, changed_records_buckets)
+        for identifier in ('after_insert', 'after_update', 'after_delete')
+    )
+
+
+def register_receivers():
+    """Connect the receivers (once) to the SQLAlchemy events.
+
+    And to the invenio-records signals.
+    """
+    from invenio_records.signals import after_record_delete, \
+        after_record_revert, after_record_update
+
+    _listen(RECEIVERS)
+    if 'invenio_records_files.models' in sys.modules:
+        register_files_receivers()
+    for signal in (after_record_update, after_record_delete,
+                   after_record_revert):
+        signal.connect(changed_record, weak=False)
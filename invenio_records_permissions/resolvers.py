@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+"""Resolution of the records owning buckets.
+
+Importing this module loads the files stack and connects the receivers
+invalidating the bucket cache (see
+:func:`invenio_records_permissions.receivers.register_files_receivers`).
+"""
+
+from flask import current_app, g, has_app_context
+from invenio_db import db
+from invenio_records.models import RecordMetadata
+from invenio_records_files.api import Record
+from invenio_records_files.models import RecordsBuckets
+
+from .receivers import register_files_receivers
+
+register_files_receivers()
+
+
+def bucket_cache_key(bucket_id):
+    """Key of the record id of a bucket in the bucket cache."""
+    return 'bucket::{}'.format(bucket_id)
+
+
+def _bucket_cache():
+    """Return the bucket -> record id cache of the application, if any."""
+    if not has_app_context():
+        return None
+    state = current_app.extensions.get('invenio-records-permissions')
+    return state.bucket_cache if state else None
+
+
+def _request_bucket_records():
+    """Return the record metadata of buckets resolved in this context."""
+    if not has_app_context():
+        return {}
+    return g.setdefault('_records_permissions_bucket_records', {})
+
+
+def forget_bucket(bucket_id):
+    """Forget the cached record of a bucket."""
+    _request_bucket_records().pop(str(bucket_id), None)
+    cache = _bucket_cache()
+    if cache is not None:
+        cache.delete(bucket_cache_key(bucket_id))
+
+
+def get_bucket_record(bucket_id):
+    """Return the record owning a bucket.
+
+    The bucket's record metadata is kept for the rest of the application
+    context, and the id of the record in the bucket cache (see
+    ``RECORDS_PERMISSIONS_BUCKET_CACHE``). A cached record id is loaded by
+    primary key, which doesn't hit the database if the record is already in
+    the session. Otherwise the record metadata is fetched with a single
+    joined query.
+
+    WARNING: invenio-records-files implies a one-to-one relationship
+             between Record and Bucket, but does not enforce it
+             "for better future" the invenio-records-files code says
+
+    :param bucket_id: The id of the bucket.
+    :returns: A :class:`invenio_records_files.api.Record` or ``None``.
+    """
+    bucket_id = str(bucket_id)
+    records = _request_bucket_records()
+    record_metadata = records.get(bucket_id)
+
+    if record_metadata is None:
+        cache = _bucket_cache()
+        key = bucket_cache_key(bucket_id)
+        record_id = cache.get(key) if cache is not None else None
+        if record_id is not None:
+            record_metadata = RecordMetadata.query.get(record_id)
+
+        if record_metadata is None:
+            record_metadata = db.session.query(RecordMetadata).join(
+                RecordsBuckets, RecordsBuckets.record_id == RecordMetadata.id
+            ).filter(RecordsBuckets.bucket_id == bucket_id).one_or_none()
+            if record_metadata is None:
+                return None
+            if cache is not None:
+                cache.set(key, str(record_metadata.id))
+
+        records[bucket_id] = record_metadata
+
+    return Record(record_metadata.json, model=record_metadata)
+
+
+def get_buckets_records(bucket_ids):
+    """Return the records owning many buckets.
+
+    Same as :func:`get_bucket_record` but the buckets not resolved yet in
+    this application context are resolved with a single ``IN`` query.
+
+    :param bucket_ids: An iterable of bucket ids.
+    :returns: A dict of bucket id (as string) to
+        :class:`invenio_records_files.api.Record`. Buckets without record are
+        left out.
+    """
+    bucket_ids = {str(bucket_id) for bucket_id in bucket_ids}
+    records = _request_bucket_records()
+
+    missing = [b for b in bucket_ids if b not in records]
+    if missing:
+        cache = _bucket_cache()
+        rows = db.session.query(
+            RecordsBuckets.bucket_id, RecordMetadata
+        ).join(
+            RecordMetadata, RecordsBuckets.record_id == RecordMetadata.id
+        ).filter(RecordsBuckets.bucket_id.in_(missing)).all()
+        for bucket_id, record_metadata in rows:
+            bucket_id = str(bucket_id)
+            records[bucket_id] = record_metadata
+            if cache is not None:
+                cache.set(
+                    bucket_cache_key(bucket_id), str(record_metadata.id)
+                )
+
+    return {
+        bucket_id: Record(records[bucket_id].json, model=records[bucket_id])
+        for bucket_id in bucket_ids if bucket_id in records
+    }
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+"""Signals sent when profiling is enabled.
+
+See ``RECORDS_PERMISSIONS_PROFILING``.
+"""
+
+from blinker import Namespace
+
+_signals = Namespace()
+
+generator_evaluated = _signals.signal('generator-evaluated')
+"""Signal sent after a generator method was evaluated by a policy.
+
+The sender is the current Flask application, and the keyword arguments are:
+
+- ``policy``: The policy instance.
+- ``generator``: The generator instance.
+- ``method``: ``'needs'``, ``'excludes'`` or ``'query_filter'``.
+- ``duration``: The wall time of the call, in seconds.
+- ``queries``: The number of database queries executed during the call.
+"""
+
+permissions_loaded = _signals.signal('permissions-loaded')
+"""Signal sent after a policy loaded its permissions.
+
+That is evaluating its generators and expanding the ActionNeeds.
+
+Same keyword arguments as :data:`generator_evaluated`, except
+``generator`` and ``method``.
+"""
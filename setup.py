@@ -19,6 +19,7 @@ history = open('CHANGES.rst').read()
 sphinx_require = 'Sphinx>=1.5.1'
 
 tests_require = [
+    'pytest-benchmark>=3.2.0',
     'pytest-mock>=1.6.0',
     'pytest-invenio>=1.3.2,<2.0.0',
     'invenio-accounts>=1.3.0,<2.0.0',
@@ -46,6 +47,9 @@ extras_require = {
     'sqlite': [
         'invenio-db[versioning]{}'.format(invenio_db_version),
     ],
+    'indexer': [
+        'invenio-indexer>=1.1.0,<2.0.0',
+    ],
     'docs': [
         sphinx_require,
     ],
@@ -66,6 +70,7 @@ setup_requires = [
 ]
 
 install_requires = [
+    'blinker>=1.4',
     'Flask-BabelEx>=0.9.4',
     'Flask-Principal>=0.4.0',
     # Because of versioning policy that may admit minor incompatible (!)
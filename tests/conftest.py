@@ -13,9 +13,12 @@ See https://pytest-invenio.readthedocs.io/ for documentation on which test
 fixtures are available.
 """
 
+from uuid import uuid4
+
 import pytest
+from flask_principal import Identity, RoleNeed, UserNeed
 from invenio_access.models import ActionRoles
-from invenio_access.permissions import superuser_access
+from invenio_access.permissions import any_user, superuser_access
 from invenio_accounts.models import Role
 from invenio_app.factory import create_app as _create_app
 from invenio_records_files.api import Record
@@ -87,6 +90,44 @@ def create_record():
     return _create_record
 
 
+@pytest.fixture(scope="session")
+def create_stored_record():
+    """Factory pattern for a record-like dict of a stored record.
+
+    The returned dict has the ``id`` and ``revision_id`` of a stored record,
+    without the database. Each record gets a new unique id, so that records
+    of different tests don't share cached summaries or decisions.
+    """
+    class StoredRecord(dict):
+        """Record-like dict identified by an id and a revision."""
+
+        def __init__(self, id_, revision_id=0, **metadata):
+            super(StoredRecord, self).__init__(**metadata)
+            self.id = id_
+            self.revision_id = revision_id
+
+    def _create_stored_record(revision_id=0, **metadata):
+        return StoredRecord(uuid4(), revision_id, **metadata)
+
+    return _create_stored_record
+
+
+@pytest.fixture(scope="session")
+def create_identity():
+    """Factory pattern for an authenticated Identity.
+
+    It provides ``any_user``, the UserNeed of the user and a RoleNeed per
+    role.
+    """
+    def _create_identity(user_id, *roles):
+        identity = Identity(user_id)
+        identity.provides |= {any_user, UserNeed(user_id)}
+        identity.provides |= {RoleNeed(role) for role in roles}
+        return identity
+
+    return _create_identity
+
+
 @pytest.fixture(scope="function")
 def create_real_record(create_record, location):
     """Factory pattern to create a real Record.
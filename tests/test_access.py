@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+from flask_principal import UserNeed
+
+from invenio_records_permissions.access import EMPTY_SUMMARY, AccessSummary, \
+    get_access_summary
+
+
+def test_access_summary(create_record):
+    record = create_record({
+        "owners": [1, 2, 1],
+        "_access": {
+            "metadata_restricted": True,
+            "files_restricted": True
+        },
+        "internal": {
+            "access_levels": {
+                "metadata_curator": [
+                    {"scheme": "person", "id": 4},
+                    {"scheme": "foo", "id": 5},
+                    {"scheme": "person"},
+                ]
+            }
+        }
+    })
+
+    summary = AccessSummary.from_record(record)
+
+    assert summary.owners == (UserNeed(1), UserNeed(2))
+    assert summary.restricted
+    assert summary.access_levels == {"metadata_curator": (UserNeed(4),)}
+    assert summary.level_needs(["metadata_curator", "admin"]) == [
+        UserNeed(4)
+    ]
+    assert get_access_summary(None) == EMPTY_SUMMARY
+
+
+def test_access_summary_is_cached_per_revision(app, create_stored_record):
+    record = create_stored_record(owners=[1])
+
+    summary = get_access_summary(record)
+    assert summary.owners == (UserNeed(1),)
+    assert get_access_summary(record) is summary
+
+    record['owners'] = [2]
+    record.revision_id = 1
+    summary = get_access_summary(record)
+    assert summary.owners == (UserNeed(2),)
+
+    # Per application
+    app.extensions['invenio-records-permissions'].clear_caches()
+    assert get_access_summary(record) is not summary
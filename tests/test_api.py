@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+from concurrent.futures import ThreadPoolExecutor
+
+from elasticsearch_dsl import Q
+from flask_principal import Identity, UserNeed
+from invenio_access.models import ActionRoles
+from invenio_access.permissions import any_user
+
+from invenio_records_permissions.api import multi_policy_filters, \
+    multi_policy_msearch_body, multi_policy_search, policy_filter, \
+    rdm_records_filter
+from invenio_records_permissions.generators import Generator, RecordOwners
+from invenio_records_permissions.policies import BasePermissionPolicy, \
+    DepositPermissionPolicy, RecordPermissionPolicy
+
+
+def _set_identity(mocker, *provides):
+    identity = Identity(1)
+    identity.provides |= set(provides)
+    for module in ['api', 'generators']:
+        patched_g = mocker.patch(
+            'invenio_records_permissions.{}.g'.format(module))
+        patched_g.identity = identity
+    return identity
+
+
+def _or(*queries):
+    return Q('bool', should=list(queries), minimum_should_match=1)
+
+
+def test_rdm_records_filter_is_cached(app, mocker):
+    spy = mocker.spy(RecordOwners, 'query_filter')
+    public = Q('term', **{"_access.metadata_restricted": False})
+
+    _set_identity(mocker, any_user, UserNeed(1))
+    assert rdm_records_filter() == _or(public, Q('term', owners=1))
+    assert rdm_records_filter() == _or(public, Q('term', owners=1))
+    assert spy.call_count == 1
+
+    # Cached per identity
+    _set_identity(mocker, any_user, UserNeed(2))
+    assert rdm_records_filter() == _or(public, Q('term', owners=2))
+    assert spy.call_count == 2
+
+
+def test_rdm_records_filter_on_indexed_permissions(app, mocker):
+    mocker.patch.dict(app.config, {'RECORDS_PERMISSIONS_INDEXED_FILTER': True})
+
+    _set_identity(mocker, any_user, UserNeed(3))
+    assert rdm_records_filter() == Q(
+        'terms', **{'_permissions.read': ['any_user', 'id:3']}
+    )
+
+
+def test_rdm_records_filter_follows_grants(
+        app, db, mocker, superuser_role_need):
+    mocker.patch.dict(app.config, {'RECORDS_PERMISSIONS_INDEXED_FILTER': True})
+    identity = Identity(5)
+    identity.provides |= {any_user, UserNeed(5), superuser_role_need}
+
+    assert rdm_records_filter(identity) == Q('match_all')
+
+    # Revoking the grant
+    db.session.delete(
+        ActionRoles.query.filter_by(action='superuser-access').one())
+    db.session.commit()
+
+    assert rdm_records_filter(identity) == Q('terms', **{
+        '_permissions.read': ['any_user', 'id:5', 'role:superuser-access']
+    })
+
+
+class CommunityRecords(Generator):
+    """Allows the records of a community."""
+
+    __slots__ = ()
+
+    def query_filter(self, community=None, **kwargs):
+        return Q('term', community=community)
+
+
+class CommunityPermissionPolicy(BasePermissionPolicy):
+    can_search = [CommunityRecords()]
+
+
+def test_policy_filter_over_objects(app):
+    identity = Identity(6)
+    identity.provides |= {any_user, UserNeed(6)}
+
+    for community in ['a', 'b']:
+        assert policy_filter(CommunityPermissionPolicy(
+            action='search', community=community
+        ), identity) == Q('term', community=community)
+
+
+def test_query_filters_explicit_identity(app):
+    public = Q('term', **{"_access.metadata_restricted": False})
+    identity = Identity(1)
+    identity.provides |= {any_user, UserNeed(1)}
+    policy = RecordPermissionPolicy(action='read')
+
+    # Outside of the request (and application) context
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        filters = executor.submit(policy.get_query_filters, identity).result()
+    assert filters == [public, Q('term', owners=1)]
+
+    assert rdm_records_filter(identity) == _or(public, Q('term', owners=1))
+
+
+def test_multi_policy_filters(app, mocker):
+    spy = mocker.spy(RecordOwners, 'query_filter')
+    public = Q('term', **{"_access.metadata_restricted": False})
+    _set_identity(mocker, any_user, UserNeed(4))
+
+    assert multi_policy_filters([
+        ('records', RecordPermissionPolicy),
+        ('records-v2', 'records'),
+        ('deposits', DepositPermissionPolicy),
+    ]) == [
+        ('records', _or(public, Q('term', owners=4))),
+        ('records-v2', _or(public, Q('term', owners=4))),
+        ('deposits', Q('term', owners=4)),
+    ]
+    # Built once per policy
+    assert spy.call_count == 2
+
+
+def test_multi_policy_msearch(app, mocker):
+    public = Q('term', **{"_access.metadata_restricted": False})
+    _set_identity(mocker, any_user, UserNeed(1))
+    searches = [
+        ('records', 'records', Q('match', title='foo')),
+        ('deposits', DepositPermissionPolicy, None),
+    ]
+
+    body = multi_policy_msearch_body(searches, size=5)
+    assert body == [
+        {'index': 'records'},
+        {'size': 5, 'query': {'bool': {
+            'filter': [_or(public, Q('term', owners=1)).to_dict()],
+            'must': [{'match': {'title': 'foo'}}],
+        }}},
+        {'index': 'deposits'},
+        {'size': 5, 'query': {'bool': {
+            'filter': [{'term': {'owners': 1}}],
+        }}},
+    ]
+
+    client = mocker.Mock()
+    client.msearch.return_value = {'responses': ['records', 'deposits']}
+    assert multi_policy_search(searches, client=client, size=5) == [
+        'records', 'deposits'
+    ]
+    client.msearch.assert_called_once_with(body=body)
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+"""Benchmarks of the policy evaluation and query filter generation.
+
+They are skipped by default (``--benchmark-skip`` in ``pytest.ini``). Run
+them alone with ``pytest tests/test_benchmarks.py --benchmark-only``, which
+overrides it, and compare runs with ``--benchmark-autosave`` and
+``--benchmark-compare``.
+
+Records are plain dicts, so that they aren't served from the caches of
+stored records and every round evaluates the generators again.
+"""
+
+import subprocess
+import sys
+import tracemalloc
+
+import pytest
+from flask import g
+from invenio_files_rest.models import Bucket
+
+from invenio_records_permissions import record_files_permission_factory
+from invenio_records_permissions.api import rdm_records_filter
+from invenio_records_permissions.generators import AllowedByAccessLevel, \
+    AnyUser, AnyUserIfPublic, Disable, RecordOwners, SuperUser
+from invenio_records_permissions.policies import BasePermissionPolicy, \
+    PolicyEvaluator
+from invenio_records_permissions.policies.records import RecordPermissionPolicy
+
+SIZES = [1, 10, 100]
+
+ACTIONS = ['search', 'create', 'read', 'update', 'delete', 'read_files',
+           'update_files']
+
+GENERATORS = [
+    AnyUser(), SuperUser(), Disable(), RecordOwners(), AnyUserIfPublic(),
+    AllowedByAccessLevel('read'),
+]
+
+
+def _class_name(obj):
+    return type(obj).__name__
+
+
+@pytest.fixture(scope='module')
+def app_config(app_config):
+    """SQLite database and no cache of the search filters."""
+    app_config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app_config['RECORDS_PERMISSIONS_FILTER_CACHE'] = False
+    return app_config
+
+
+def make_record(create_record, size, restricted=True):
+    """Record with ``size`` owners and ``size`` entries per access level."""
+    return create_record({
+        "owners": list(range(1, size + 1)),
+        "_access": {
+            "metadata_restricted": restricted,
+            "files_restricted": restricted
+        },
+        "internal": {
+            "access_levels": {
+                level: [
+                    {"scheme": "person", "id": i} for i in range(size)
+                ] + [
+                    {"scheme": "role", "id": "role-{}".format(i)}
+                    for i in range(size)
+                ]
+                for level in AllowedByAccessLevel.ACTION_TO_ACCESS_LEVELS[
+                    'read']
+            }
+        }
+    })
+
+
+@pytest.fixture(scope='module')
+def non_owner_identity(create_identity):
+    """Factory of identities providing ``size`` Needs besides any_user.
+
+    They don't own any record nor have any of its access levels.
+    """
+    def _non_owner_identity(size):
+        return create_identity(
+            0, *['other-role-{}'.format(i) for i in range(size - 1)]
+        )
+
+    return _non_owner_identity
+
+
+@pytest.fixture()
+def g_identity(request, non_owner_identity):
+    """Set ``g.identity`` to an identity of ``request.param`` Needs."""
+    identity = non_owner_identity(request.param)
+    g.identity = identity
+    yield identity
+    del g.identity
+
+
+@pytest.mark.parametrize('size', SIZES)
+@pytest.mark.parametrize('action', ACTIONS)
+def test_policy_needs_excludes(
+        benchmark, app, db, create_record, action, size):
+    record = make_record(create_record, size)
+
+    def evaluate():
+        policy = RecordPermissionPolicy(action=action, record=record)
+        return policy.needs, policy.excludes
+
+    benchmark.group = 'policy.needs/excludes'
+    benchmark(evaluate)
+
+
+@pytest.mark.parametrize('size', SIZES)
+@pytest.mark.parametrize('action', ACTIONS)
+def test_policy_can(
+        benchmark, app, db, create_record, non_owner_identity, action,
+        size):
+    record = make_record(create_record, size)
+    identity = non_owner_identity(size)
+
+    def can():
+        return RecordPermissionPolicy(
+            action=action, record=record
+        ).allows(identity)
+
+    benchmark.group = 'policy.can'
+    benchmark(can)
+
+
+@pytest.mark.parametrize('size', SIZES)
+@pytest.mark.parametrize('action', ACTIONS)
+def test_policy_evaluator(
+        benchmark, app, db, create_record, non_owner_identity, action,
+        size):
+    record = make_record(create_record, size)
+    evaluator = PolicyEvaluator(
+        RecordPermissionPolicy, action, non_owner_identity(size)
+    )
+
+    benchmark.group = 'policy.can'
+    benchmark(evaluator.allows, record)
+
+
+def _peak_memory(check, *args):
+    """Peak of the memory allocated by a call, in bytes."""
+    tracemalloc.start()
+    try:
+        check(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize('action', ['read', 'update'])
+def test_memory_per_check(
+        app, db, create_record, non_owner_identity, action):
+    record = make_record(create_record, 10)
+    identity = non_owner_identity(10)
+    evaluator = PolicyEvaluator(RecordPermissionPolicy, action, identity)
+
+    def policy_allows(record):
+        return RecordPermissionPolicy(
+            action=action, record=record
+        ).allows(identity)
+
+    # Fill the caches first
+    assert evaluator.allows(record) == policy_allows(record)
+
+    policy_peak = _peak_memory(policy_allows, record)
+    evaluator_peak = _peak_memory(evaluator.allows, record)
+    assert evaluator_peak < policy_peak
+
+
+@pytest.mark.parametrize('size', SIZES)
+@pytest.mark.parametrize('generator', GENERATORS, ids=_class_name)
+def test_generator_needs(benchmark, create_record, generator, size):
+    record = make_record(create_record, size)
+
+    benchmark.group = 'generator.needs'
+    benchmark(generator.needs, record=record)
+
+
+@pytest.mark.parametrize('g_identity', SIZES, indirect=True)
+@pytest.mark.parametrize('generator', GENERATORS, ids=_class_name)
+def test_generator_query_filter(benchmark, appctx, generator, g_identity):
+    benchmark.group = 'generator.query_filter'
+    benchmark(generator.query_filter)
+
+
+@pytest.mark.parametrize('g_identity', SIZES, indirect=True)
+def test_rdm_records_filter(benchmark, appctx, db, g_identity):
+    benchmark.group = 'rdm_records_filter'
+    benchmark(rdm_records_filter)
+
+
+@pytest.mark.parametrize('action', ['bucket-read', 'bucket-update'])
+def test_record_files_permission_factory(
+        benchmark, create_real_record, db, non_owner_identity, action):
+    record = create_real_record()
+    bucket = Bucket.get(record['_bucket'])
+    identity = non_owner_identity(1)
+
+    def can():
+        return record_files_permission_factory(bucket, action).allows(
+            identity)
+
+    benchmark.group = 'record_files_permission_factory'
+    # The evaluations over stored records are memoized per request
+    benchmark.pedantic(
+        can, setup=BasePermissionPolicy.invalidate, rounds=200,
+        warmup_rounds=1
+    )
+
+
+def test_import_time(benchmark):
+    """Import the package and initialize it on an application."""
+    code = (
+        "from flask import Flask; "
+        "from invenio_records_permissions import InvenioRecordsPermissions; "
+        "InvenioRecordsPermissions(Flask('testapp'))"
+    )
+    benchmark.group = 'import'
+    benchmark.pedantic(
+        subprocess.check_call, args=([sys.executable, '-c', code],),
+        rounds=5,
+    )
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+from invenio_records_permissions.cache import TTLCache
+
+
+def test_ttl_cache_lru():
+    cache = TTLCache(maxsize=2)
+
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'b' is now the least recently used
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert len(cache) == 2
+
+    assert cache.delete('a')
+    assert not cache.delete('a')
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_ttl_cache_expiration():
+    now = [0]
+    cache = TTLCache(ttl=10, timer=lambda: now[0])
+
+    cache.set('a', 1)
+    cache.set('b', 2, timeout=20)
+    now[0] = 10
+    assert cache.get('a') is None
+    assert cache.get('b') == 2
+    now[0] = 20
+    assert cache.get('b') is None
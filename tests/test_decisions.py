@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+import pytest
+from flask_principal import RoleNeed
+from invenio_access.models import ActionRoles
+from invenio_access.permissions import superuser_access
+from invenio_accounts.models import Role, User
+
+from invenio_records_permissions.cache import identity_fingerprint
+from invenio_records_permissions.generators import AnyUser, RecordOwners
+from invenio_records_permissions.policies import BasePermissionPolicy
+from invenio_records_permissions.proxies import current_records_permissions
+
+
+@pytest.fixture(scope='module')
+def app_config(app_config):
+    """In-process decision cache."""
+    app_config['RECORDS_PERMISSIONS_DECISION_CACHE'] = None
+    return app_config
+
+
+class OwnersPermissionPolicy(BasePermissionPolicy):
+    can_read = [RecordOwners()]
+
+
+class Public(object):
+    class PermissionPolicy(BasePermissionPolicy):
+        can_read = [AnyUser()]
+
+
+class Restricted(object):
+    class PermissionPolicy(BasePermissionPolicy):
+        can_read = []
+
+
+def check(record, identity):
+    # Forget the evaluations memoized in the application context, as a new
+    # request would
+    BasePermissionPolicy.invalidate()
+    return OwnersPermissionPolicy(action='read', record=record).allows(
+        identity)
+
+
+def test_identity_fingerprint(create_identity):
+    identity = create_identity(1)
+    fingerprint = identity_fingerprint(identity)
+
+    assert identity_fingerprint(create_identity(1)) == fingerprint
+    assert identity_fingerprint(create_identity(2)) != fingerprint
+
+    identity.provides.add(RoleNeed('curator'))
+    assert identity_fingerprint(identity) == identity_fingerprint(
+        create_identity(1, 'curator'))
+
+    # Same number of Needs
+    identity.provides.remove(RoleNeed('curator'))
+    identity.provides.add(RoleNeed('admin'))
+    assert identity_fingerprint(identity) == identity_fingerprint(
+        create_identity(1, 'admin'))
+
+
+def test_decisions_are_cached(
+        app, db, mocker, create_stored_record, create_identity):
+    spy = mocker.spy(RecordOwners, 'needs')
+    record = create_stored_record(owners=[1])
+    owner, other = create_identity(1), create_identity(2)
+    current_records_permissions.reset_stats()
+
+    assert check(record, owner)
+    assert check(record, create_identity(1))
+    assert spy.call_count == 1
+
+    # Other Needs
+    assert not check(record, other)
+    assert spy.call_count == 2
+
+    # Other revision
+    record['owners'] = [2]
+    record.revision_id = 1
+    assert not check(record, owner)
+    assert check(record, other)
+    assert spy.call_count == 4
+
+    # Unkeyed evaluations aren't cached
+    assert not OwnersPermissionPolicy(
+        action='read', record={'owners': [2]}
+    ).allows(owner)
+
+    assert current_records_permissions.decision_stats() == {
+        'hits': 1, 'misses': 4, 'hit_ratio': 0.2
+    }
+    current_records_permissions.reset_stats()
+    assert current_records_permissions.decision_stats()['misses'] == 0
+
+
+def test_decisions_per_policy_class(
+        app, create_stored_record, create_identity):
+    record = create_stored_record(owners=[1])
+    identity = create_identity(2)
+
+    assert Public.PermissionPolicy(action='read', record=record).allows(
+        identity)
+    assert not Restricted.PermissionPolicy(
+        action='read', record=record
+    ).allows(identity)
+
+
+def test_decisions_are_invalidated(
+        app, db, mocker, create_stored_record, create_identity):
+    spy = mocker.spy(RecordOwners, 'needs')
+    record = create_stored_record(owners=[1])
+    curator = create_identity(2, 'curator')
+
+    assert not check(record, curator)
+    assert not check(record, curator)
+    assert spy.call_count == 1
+
+    # Granting an action
+    role = Role(name='curator')
+    db.session.add(role)
+    db.session.add(ActionRoles.create(action=superuser_access, role=role))
+    db.session.commit()
+
+    assert check(record, curator)
+
+    # Changing role memberships
+    decision_cache = current_records_permissions.decision_cache
+    generation = decision_cache.generation()
+    user = User(email='curator@inveniosoftware.org', active=True)
+    db.session.add(user)
+    user.roles.append(role)
+    assert decision_cache.generation() != generation
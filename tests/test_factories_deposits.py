@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+from elasticsearch_dsl import Q
+from flask_principal import Identity, UserNeed
+from invenio_access.permissions import any_user
+
+from invenio_records_permissions.api import deposits_filter
+from invenio_records_permissions.factories.deposits import \
+    deposit_bulk_allows, deposit_create_permission_factory, \
+    deposit_delete_permission_factory, deposit_read_permission_factory
+from invenio_records_permissions.generators import AnyUser
+from invenio_records_permissions.policies import DepositPermissionPolicy, \
+    get_deposit_permission_policy
+
+
+class OpenDepositPermissionPolicy(DepositPermissionPolicy):
+    can_read = [AnyUser()]
+
+
+def test_deposit_read_permission_factory(app, superuser_role_need):
+    deposit = {'owners': [1, 2]}
+
+    read_perm = deposit_read_permission_factory(deposit)
+
+    assert isinstance(read_perm, DepositPermissionPolicy)
+    assert read_perm.over == {'record': deposit}
+    assert read_perm.needs == {superuser_role_need, UserNeed(1), UserNeed(2)}
+    assert read_perm.excludes == set()
+
+
+def test_deposit_permission_factories(app, superuser_role_need):
+    deposit = {'owners': [1]}
+
+    assert deposit_create_permission_factory().needs == {
+        superuser_role_need, any_user
+    }
+    assert deposit_delete_permission_factory(deposit).needs == {
+        superuser_role_need
+    }
+
+
+def test_deposit_permission_policy_config(app):
+    state = app.extensions['invenio-records-permissions']
+    with app.app_context():
+        assert get_deposit_permission_policy() is DepositPermissionPolicy
+
+        app.config['RECORDS_PERMISSIONS_DEPOSIT_POLICY'] = \
+            OpenDepositPermissionPolicy
+        state.reload_policies()
+        try:
+            assert get_deposit_permission_policy() is \
+                OpenDepositPermissionPolicy
+            assert isinstance(
+                deposit_read_permission_factory({'owners': [1]}),
+                OpenDepositPermissionPolicy
+            )
+
+            # Resolved once
+            app.config['RECORDS_PERMISSIONS_DEPOSIT_POLICY'] = \
+                DepositPermissionPolicy
+            assert get_deposit_permission_policy() is \
+                OpenDepositPermissionPolicy
+        finally:
+            app.config['RECORDS_PERMISSIONS_DEPOSIT_POLICY'] = \
+                DepositPermissionPolicy
+            state.reload_policies()
+
+
+def test_deposit_bulk_allows(app, superuser_role_need):
+    deposits = [{'owners': [1]}, {'owners': [2]}, {'owners': [1, 2]}]
+    identity = Identity(1)
+    identity.provides |= {any_user, UserNeed(1)}
+
+    assert deposit_bulk_allows(deposits, 'read', identity) == [
+        True, False, True
+    ]
+
+
+def test_deposits_filter(app, superuser_role_need):
+    identity = Identity(1)
+    identity.provides |= {any_user, UserNeed(1)}
+
+    assert deposits_filter(identity) == Q('term', owners=1)
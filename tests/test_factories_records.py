@@ -11,7 +11,7 @@ from io import BytesIO
 
 import pytest
 from elasticsearch_dsl import Q
-from flask_principal import ActionNeed, UserNeed
+from flask_principal import ActionNeed, Identity, UserNeed
 from invenio_access.permissions import any_user, superuser_access
 from invenio_files_rest.models import Bucket, ObjectVersion
 
@@ -19,9 +19,9 @@ from invenio_files_rest.models import Bucket, ObjectVersion
 #       If isort PR is merged:
 #       https://github.com/inveniosoftware/cookiecutter-invenio-module/pull/129
 from invenio_records_permissions import record_create_permission_factory, \
-    record_delete_permission_factory, record_files_permission_factory, \
-    record_read_permission_factory, record_search_permission_factory, \
-    record_update_permission_factory
+    record_delete_permission_factory, record_files_bulk_allows, \
+    record_files_permission_factory, record_read_permission_factory, \
+    record_search_permission_factory, record_update_permission_factory
 
 
 @pytest.fixture(scope="module")
@@ -144,3 +144,59 @@ def test_read_files_permission_factory(
     }
     assert permission.excludes == set()
     assert permission.action == 'read_files'
+
+
+def test_files_permission_factory_with_record(
+        create_real_record, mocker, superuser_role_need):
+    record = create_real_record()
+    bucket = Bucket.get(record['_bucket'])
+    resolver = mocker.patch(
+        'invenio_records_permissions.resolvers.get_bucket_record')
+
+    permission = record_files_permission_factory(
+        bucket, 'bucket-read', record=record)
+
+    assert not resolver.called
+    assert permission.needs == {
+        superuser_role_need,
+        any_user,
+        UserNeed(1),
+        UserNeed(2),
+        UserNeed(3)
+    }
+
+
+def test_files_bulk_allows(create_real_record, db):
+    public_record = create_real_record()
+    restricted_record = create_real_record({
+        "_access": {
+            "metadata_restricted": True,
+            "files_restricted": True
+        },
+        "owners": [4],
+    })
+    objs = [
+        ObjectVersion.create(
+            record['_bucket'], name, stream=BytesIO(b"file content"))
+        for record, name in [
+            (public_record, "a.txt"),
+            (restricted_record, "b.txt"),
+            (public_record, "c.txt"),
+        ]
+    ]
+    db.session.commit()
+
+    anonymous = Identity(None)
+    anonymous.provides.add(any_user)
+    assert record_files_bulk_allows(objs, 'object-read', anonymous) == [
+        True, False, True
+    ]
+
+    owner = Identity(4)
+    owner.provides |= {any_user, UserNeed(4)}
+    assert record_files_bulk_allows(objs, 'object-read', owner) == [
+        True, True, True
+    ]
+    assert record_files_bulk_allows(objs, 'bucket-update', owner) == [
+        False, True, False
+    ]
@@ -8,14 +8,88 @@
 # more details.
 
 import copy
+import operator
+from functools import reduce
 
 import pytest
-from flask_principal import ActionNeed, UserNeed
+from elasticsearch_dsl import Q
+from flask_principal import ActionNeed, Identity, RoleNeed, UserNeed
 from invenio_access.permissions import any_user, superuser_access
 
 from invenio_records_permissions.generators import Admin, \
     AllowedByAccessLevel, AnyUser, AnyUserIfPublic, Disable, Generator, \
-    RecordOwners, SuperUser
+    RecordOwners, SuperUser, provides_index
+
+READ_ACCESS_LEVELS = [
+    'metadata_reader', 'metadata_curator', 'files_reader', 'files_curator',
+    'admin'
+]
+
+
+def _access_levels_filter(*identities):
+    """Filter of the read access levels for ``(schemes, ids)`` pairs."""
+    def term_or_terms(field, values):
+        if len(values) == 1:
+            return Q('term', **{field: values[0]})
+        return Q('terms', **{field: values})
+
+    def level_filter(field):
+        return reduce(operator.or_, [
+            Q('bool', filter=[
+                term_or_terms('{}.scheme'.format(field), schemes),
+                term_or_terms('{}.id'.format(field), ids),
+            ])
+            for schemes, ids in identities
+        ])
+
+    return reduce(operator.or_, [
+        Q('nested', path='internal.access_levels.{}'.format(level),
+          query=level_filter('internal.access_levels.{}'.format(level)))
+        for level in READ_ACCESS_LEVELS
+    ])
+
+
+def _values(doc, path):
+    """Values of a dotted field of a document, flattening the arrays."""
+    values = [doc]
+    for name in path.split('.'):
+        values = [v.get(name) for v in values if isinstance(v, dict)]
+        values = [
+            item for v in values if v is not None
+            for item in (v if isinstance(v, list) else [v])
+        ]
+    return values
+
+
+def _matches(query, doc, prefix=''):
+    """Evaluate the query filters used by the generators on a document.
+
+    Objects are flattened as in Elasticsearch, except ``nested`` ones, which
+    are matched one entry at a time.
+    """
+    kind, params = next(iter(query.items()))
+    if kind in ('term', 'terms'):
+        field, values = next(iter(params.items()))
+        values = values if kind == 'terms' else [values]
+        return any(
+            v in values for v in _values(doc, field[len(prefix):])
+        )
+    if kind == 'nested':
+        path = params['path']
+        return any(
+            _matches(params['query'], entry, prefix=path + '.')
+            for entry in _values(doc, path[len(prefix):])
+        )
+    if kind == 'bool':
+        return all(
+            _matches(q, doc, prefix) for q in params.get('filter', [])
+        ) and all(
+            not _matches(q, doc, prefix) for q in params.get('must_not', [])
+        ) and (
+            not params.get('should') or
+            any(_matches(q, doc, prefix) for q in params['should'])
+        )
+    raise NotImplementedError(kind)
 
 
 def test_generator():
@@ -136,6 +210,41 @@ def test_allowedbyaccesslevels_metadata_curator(action, create_record):
     assert generator.excludes(record=record) == []
 
 
+@pytest.mark.parametrize("action,levels", [
+    ('read', READ_ACCESS_LEVELS),
+    ('update', ['metadata_curator', 'admin']),
+    ('delete', ['admin']),
+    ('read_files', ['files_reader', 'files_curator', 'admin']),
+    ('update_files', ['files_curator', 'admin']),
+])
+def test_allowedbyaccesslevels_schemes(action, levels, create_record):
+    record = create_record({
+        "internal": {
+            "access_levels": {
+                level: [
+                    {"scheme": "person", "id": i},
+                    {"scheme": "role", "id": "role-{}".format(i)},
+                    {"scheme": "group", "id": "group-{}".format(i)},
+                    {"scheme": "person", "id": 99},
+                ]
+                for i, level in enumerate(READ_ACCESS_LEVELS, 1)
+            }
+        }
+    })
+    generator = AllowedByAccessLevel(action=action)
+
+    expected = [UserNeed(99)]
+    for i, level in enumerate(READ_ACCESS_LEVELS, 1):
+        if level in levels:
+            expected += [
+                UserNeed(i),
+                RoleNeed("role-{}".format(i)),
+                RoleNeed("group-{}".format(i)),
+            ]
+    assert set(generator.needs(record=record)) == set(expected)
+    assert len(generator.needs(record=record)) == len(expected)
+
+
 def test_allowedbyaccesslevels_query_filter(mocker):
     # TODO: Test query_filter on actual Elasticsearch instance per #23
 
@@ -144,14 +253,9 @@ def test_allowedbyaccesslevels_query_filter(mocker):
     patched_g = mocker.patch('invenio_records_permissions.generators.g')
     patched_g.identity.provides = [mocker.Mock(method='id', value=1)]
 
-    # TODO: Update to account for other 'read' access levels
-    assert generator.query_filter().to_dict() == {
-        'term': {
-            'internal.access_levels.metadata_curator': {
-                'scheme': 'person', 'id': 1
-            }
-        }
-    }
+    assert generator.query_filter() == _access_levels_filter(
+        (['person'], [1])
+    )
 
     # User that doesn't provide 'id'
     generator = AllowedByAccessLevel()
@@ -159,3 +263,103 @@ def test_allowedbyaccesslevels_query_filter(mocker):
     patched_g.identity.provides = [mocker.Mock(method='foo', value=1)]
 
     assert generator.query_filter() == []
+
+
+def test_provides_index():
+    identity = Identity(1)
+    identity.provides |= {UserNeed(1), RoleNeed('curator'), RoleNeed('admin')}
+
+    index = provides_index(identity)
+    assert index == {'id': (1,), 'role': ('admin', 'curator')}
+    assert provides_index(identity) is index
+
+    identity.provides.add(UserNeed(2))
+    assert provides_index(identity)['id'] == (1, 2)
+
+    # Same number of Needs
+    identity.provides.remove(RoleNeed('admin'))
+    identity.provides.add(RoleNeed('editor'))
+    assert provides_index(identity)['role'] == ('curator', 'editor')
+
+
+def test_query_filters_many_ids(mocker):
+    patched_g = mocker.patch('invenio_records_permissions.generators.g')
+    patched_g.identity.provides = [
+        mocker.Mock(method='id', value=2),
+        mocker.Mock(method='role', value='admin'),
+        mocker.Mock(method='id', value=1),
+    ]
+
+    assert RecordOwners().query_filter().to_dict() == {
+        'terms': {'owners': [1, 2]}
+    }
+    assert AllowedByAccessLevel().query_filter() == _access_levels_filter(
+        (['person'], [1, 2]), (['group', 'role'], ['admin'])
+    )
+
+
+def test_allowedbyaccesslevels_query_filter_mixed_schemes(create_record):
+    record = create_record({
+        "internal": {
+            "access_levels": {
+                "metadata_reader": [
+                    {"scheme": "group", "id": 1},
+                    {"scheme": "person", "id": 2},
+                ]
+            }
+        }
+    })
+    generator = AllowedByAccessLevel()
+
+    for need, allowed in [(UserNeed(1), False), (UserNeed(2), True),
+                          (RoleNeed(1), True), (RoleNeed(2), False)]:
+        identity = Identity(1)
+        identity.provides.add(need)
+
+        assert (need in generator.needs(record=record)) is allowed
+        assert _matches(
+            generator.query_filter(identity=identity).to_dict(), record
+        ) is allowed
+
+
+def test_query_filters_explicit_identity():
+    # No request context needed
+    identity = Identity(1)
+    identity.provides |= {UserNeed(1), RoleNeed('curator')}
+
+    assert RecordOwners().query_filter(identity=identity) == Q(
+        'term', owners=1
+    )
+    assert AllowedByAccessLevel().query_filter(
+        identity=identity
+    ) == _access_levels_filter(
+        (['person'], [1]), (['group', 'role'], ['curator'])
+    )
+
+
+def test_generators_are_immutable():
+    generator = AllowedByAccessLevel(action='update')
+    assert generator.access_levels == ('metadata_curator', 'admin')
+
+    with pytest.raises(AttributeError):
+        generator.action = 'read'
+    with pytest.raises(AttributeError):
+        generator.access_levels = ()
+    with pytest.raises(AttributeError):
+        del generator.action
+    with pytest.raises(AttributeError):
+        RecordOwners().foo = 'bar'
+
+    for generator in [AnyUser(), SuperUser(), Disable(), Admin(),
+                      RecordOwners(), AnyUserIfPublic(), generator]:
+        assert not hasattr(generator, '__dict__')
+
+    # Attributes of custom generators can be set in the constructor only
+    class Custom(Generator):
+        def __init__(self, value):
+            self.value = value
+
+    custom = Custom(1)
+    assert custom.value == 1
+    with pytest.raises(AttributeError):
+        custom.value = 2
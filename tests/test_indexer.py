@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+from elasticsearch_dsl import Q
+from flask_principal import Identity, RoleNeed, UserNeed
+from invenio_access.permissions import any_user
+
+from invenio_records_permissions.generators import Disable
+from invenio_records_permissions.indexer import index_permissions, \
+    indexed_filter, indexed_permissions, need_token
+from invenio_records_permissions.policies.records import RecordPermissionPolicy
+
+
+class DisabledReadPolicy(RecordPermissionPolicy):
+    """Policy excluding everyone from reading."""
+
+    can_read = RecordPermissionPolicy.can_read + [Disable()]
+
+
+def test_need_token():
+    assert need_token(any_user) == 'any_user'
+    assert need_token(UserNeed(5)) == 'id:5'
+    assert need_token(RoleNeed('admin')) == 'role:admin'
+
+
+def test_indexed_permissions(create_record):
+    public = create_record({"owners": [1]})
+    restricted = create_record({
+        "owners": [1, 2], "_access": {"metadata_restricted": True}
+    })
+
+    assert indexed_permissions(RecordPermissionPolicy, public) == {
+        'read': ['any_user', 'id:1']
+    }
+    assert indexed_permissions(
+        RecordPermissionPolicy, restricted, ['read', 'update']
+    ) == {
+        'read': ['id:1', 'id:2'],
+        'update': ['id:1', 'id:2'],
+    }
+    assert indexed_permissions(DisabledReadPolicy, public) == {'read': []}
+
+
+def test_index_permissions(app, create_record):
+    json = {}
+    index_permissions(app, json=json, record=create_record({"owners": [3]}))
+    assert json == {'_permissions': {'read': ['any_user', 'id:3']}}
+
+
+def test_indexed_filter(app, superuser_role_need):
+    identity = Identity(1)
+    identity.provides |= {any_user, UserNeed(1), RoleNeed('curator')}
+    policy = RecordPermissionPolicy(action='read')
+
+    assert indexed_filter(policy, identity) == Q(
+        'terms', **{'_permissions.read': ['any_user', 'id:1', 'role:curator']}
+    )
+
+    # Super users see everything
+    identity.provides.add(superuser_role_need)
+    assert indexed_filter(policy, identity) == Q('match_all')
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+import pytest
+from flask_principal import Identity, UserNeed
+from invenio_access.permissions import any_user
+
+from invenio_records_permissions.instrumentation import PermissionsProfiler
+from invenio_records_permissions.policies.records import RecordPermissionPolicy
+from invenio_records_permissions.proxies import current_records_permissions
+from invenio_records_permissions.signals import generator_evaluated, \
+    permissions_loaded
+
+GENERATORS = 'invenio_records_permissions.generators.'
+POLICIES = 'invenio_records_permissions.policies.records.'
+
+
+@pytest.fixture(scope='module')
+def app_config(app_config):
+    """Enable profiling."""
+    app_config['RECORDS_PERMISSIONS_PROFILING'] = True
+    return app_config
+
+
+def test_profiler():
+    ticks = iter([1.0, 1.5, 2.0, 4.0])
+    profiler = PermissionsProfiler(None, timer=lambda: next(ticks))
+    generator = RecordPermissionPolicy.can_update[0]
+
+    for _ in range(2):
+        assert profiler.call(
+            None, generator, 'needs', {'record': {'owners': [1]}}
+        ) == [UserNeed(1)]
+
+    assert profiler.stats() == {
+        GENERATORS + 'RecordOwners.needs': {
+            'calls': 2, 'time': 2.5, 'max_time': 2.0, 'queries': 0
+        }
+    }
+    profiler.reset()
+    assert profiler.stats() == {}
+
+
+def test_stats(app, db, create_record):
+    current_records_permissions.reset_stats()
+    events = []
+
+    def receiver(sender, **kwargs):
+        events.append(kwargs)
+
+    identity = Identity(1)
+    identity.provides |= {any_user, UserNeed(1)}
+    record = create_record({"_access": {"metadata_restricted": True}})
+
+    with generator_evaluated.connected_to(receiver, sender=app), \
+            permissions_loaded.connected_to(receiver, sender=app):
+        policy = RecordPermissionPolicy(action='update', record=record)
+        assert policy.needs == {UserNeed(1), UserNeed(2), UserNeed(3)}
+        assert RecordPermissionPolicy(
+            action='read', record=record
+        ).allows(identity)
+
+    stats = current_records_permissions.stats()
+    assert stats[GENERATORS + 'AnyUserIfPublic.needs']['calls'] == 1
+    assert stats[GENERATORS + 'RecordOwners.needs']['calls'] == 2
+    assert stats[GENERATORS + 'RecordOwners.excludes']['calls'] == 1
+    # The superuser-access ActionNeed was expanded from the database
+    loaded = stats[POLICIES + 'RecordPermissionPolicy._load_permissions']
+    assert loaded['calls'] == 1
+    assert loaded['queries'] >= 1
+
+    assert len(events) == 5
+    assert [e.get('method') for e in events] == [
+        'needs', 'excludes', None, 'needs', 'needs'
+    ]
+    assert events[2]['policy'] is policy
+    assert set(events[2]) == {'policy', 'duration', 'queries'}
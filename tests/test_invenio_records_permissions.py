@@ -11,9 +11,14 @@
 
 from __future__ import absolute_import, print_function
 
+import subprocess
+import sys
+
 from flask import Flask
 
-from invenio_records_permissions import InvenioRecordsPermissions
+from invenio_records_permissions import DepositPermissionPolicy, \
+    InvenioRecordsPermissions, RecordPermissionPolicy
+from invenio_records_permissions.policies import get_record_permission_policy
 
 
 def test_version():
@@ -33,3 +38,42 @@ def test_init():
     assert 'invenio-records-permissions' not in app.extensions
     ext.init_app(app)
     assert 'invenio-records-permissions' in app.extensions
+
+
+def test_policies():
+    """Test policies resolution."""
+    app = Flask('testapp')
+    InvenioRecordsPermissions(app)
+    state = app.extensions['invenio-records-permissions']
+
+    assert state.get_policy('records') is RecordPermissionPolicy
+
+    app.config['RECORDS_PERMISSIONS_RECORD_POLICY'] = \
+        'invenio_records_permissions.policies.DepositPermissionPolicy'
+    with app.app_context():
+        # Resolved once
+        assert get_record_permission_policy() is RecordPermissionPolicy
+        state.reload_policies()
+        assert get_record_permission_policy() is DepositPermissionPolicy
+
+    state.register_policy(
+        'communities', 'COMMUNITIES_POLICY', default=RecordPermissionPolicy)
+    assert state.get_policy('communities') is RecordPermissionPolicy
+
+
+def test_lazy_imports():
+    """Test the files stack and elasticsearch_dsl are imported lazily."""
+    code = (
+        "import sys, invenio_records_permissions.generators, "
+        "invenio_records_permissions.factories; "
+        "from flask import Flask; "
+        "from invenio_records_permissions import InvenioRecordsPermissions; "
+        "InvenioRecordsPermissions(Flask('testapp')); "
+        "print(' '.join(sys.modules))"
+    )
+    modules = subprocess.check_output([sys.executable, '-c', code])
+    modules = {name.split('.')[0] for name in modules.decode().split()}
+
+    for name in ['elasticsearch_dsl', 'invenio_files_rest',
+                 'invenio_records_files', 'invenio_search']:
+        assert name not in modules
@@ -7,11 +7,21 @@
 # and/or modify it under the terms of the MIT License; see LICENSE file for
 # more details.
 
+import asyncio
+
+import pytest
 from elasticsearch_dsl import Q
-from invenio_access.permissions import any_user
+from flask_principal import Identity, RoleNeed, UserNeed
+from invenio_access import Permission
+from invenio_access.models import ActionRoles, ActionUsers
+from invenio_access.permissions import any_user, superuser_access
+from invenio_accounts.models import Role
 
-from invenio_records_permissions.generators import AnyUser, Disable
-from invenio_records_permissions.policies import BasePermissionPolicy
+from invenio_records_permissions.cache import TTLCache
+from invenio_records_permissions.generators import AnyUser, AnyUserIfPublic, \
+    Disable, RecordOwners
+from invenio_records_permissions.policies import BasePermissionPolicy, \
+    PolicyEvaluator
 
 
 def test_base_permission_policy_generators(app):
@@ -68,3 +78,351 @@ def test_permission_policy_needs_excludes(superuser_role_need):
 
     assert foo_bar_perm.needs == {superuser_role_need, any_user}
     assert foo_bar_perm.excludes == set()
+
+
+class OwnersPermissionPolicy(BasePermissionPolicy):
+    can_read = [RecordOwners()]
+
+
+def test_permission_policy_evaluation_is_memoized(
+        app, mocker, create_stored_record):
+    spy = mocker.spy(RecordOwners, 'needs')
+    record = create_stored_record(owners=[1])
+
+    read_perm = OwnersPermissionPolicy(action='read', record=record)
+    assert read_perm.needs == {UserNeed(1)}
+    assert read_perm.excludes == set()
+    assert spy.call_count == 1
+
+    # Another policy over the same record revision reuses the evaluation
+    other_read_perm = OwnersPermissionPolicy(action='read', record=record)
+    assert other_read_perm.needs == {UserNeed(1)}
+    assert spy.call_count == 1
+
+    # A new revision is evaluated again
+    record.revision_id = 1
+    OwnersPermissionPolicy(action='read', record=record).needs
+    assert spy.call_count == 2
+
+    # So are records that can't be identified
+    OwnersPermissionPolicy(action='read', record={'owners': [1]}).needs
+    assert spy.call_count == 3
+
+    OwnersPermissionPolicy.invalidate(record=record)
+    OwnersPermissionPolicy(action='read', record=record).needs
+    assert spy.call_count == 4
+
+
+def test_permission_policy_evaluation_follows_grants(
+        app, db, superuser_role_need):
+    # A single application context, as in a CLI command or a Celery task
+    superuser = Identity(1)
+    superuser.provides |= {any_user, UserNeed(1), superuser_role_need}
+
+    policy = OwnersPermissionPolicy(action='read')
+    assert policy.needs == {superuser_role_need}
+    assert policy.allows(superuser)
+
+    action_role = ActionRoles.query.filter_by(
+        action=superuser_access.value).one()
+    db.session.delete(action_role)
+    db.session.commit()
+
+    policy = OwnersPermissionPolicy(action='read')
+    assert policy.needs == {superuser_access}
+    assert not policy.allows(superuser)
+
+
+def test_permission_policy_evaluation_after_rollback(
+        app, db, superuser_role_need):
+    savepoint = db.session.begin_nested()
+    role = Role(name='curators')
+    db.session.add(role)
+    db.session.add(ActionRoles.create(action=superuser_access, role=role))
+    db.session.flush()
+
+    assert OwnersPermissionPolicy(action='read').needs == {
+        superuser_role_need, RoleNeed('curators')
+    }
+
+    savepoint.rollback()
+
+    assert OwnersPermissionPolicy(action='read').needs == {
+        superuser_role_need
+    }
+
+
+def test_permission_policy_evaluation_has_no_side_effects(app):
+    policy = OwnersPermissionPolicy(action='read', record={'owners': [1]})
+
+    for _ in range(2):
+        assert policy.needs == {UserNeed(1)}
+        assert policy.excludes == set()
+    assert policy.explicit_needs == {superuser_access}
+    assert policy.explicit_excludes == set()
+    assert isinstance(policy.needs, frozenset)
+
+
+def test_permission_policy_plan(app, mocker):
+    spy = mocker.spy(AnyUser, 'needs')
+
+    plan = TestPermissionPolicy.get_plan('read')
+    assert plan.static_needs == {any_user}
+    assert plan.static_excludes == set()
+    assert plan.dynamic == ()
+
+    # Static generators were evaluated at class creation
+    assert TestPermissionPolicy(action='read').needs == {any_user}
+    assert spy.call_count == 0
+
+    plan = OwnersPermissionPolicy.get_plan('read')
+    assert plan.static_needs == set()
+    assert isinstance(plan.dynamic[0], RecordOwners)
+    assert not plan.excluding
+
+    assert TestPermissionPolicy.get_plan('random').static_excludes == {
+        any_user
+    }
+
+
+def test_permission_policy_plan_is_recompiled(app):
+    class Policy(BasePermissionPolicy):
+        can_read = [AnyUser()]
+
+    assert Policy.get_plan('read').static_excludes == set()
+    Policy.can_read = [Disable()]
+    assert Policy.get_plan('read').static_excludes == {any_user}
+
+    # Changed in place
+    Policy.can_read.append(AnyUser())
+    assert Policy.get_plan('read').static_needs == {any_user}
+    Policy.can_read.pop(0)
+    assert Policy.get_plan('read').static_excludes == set()
+
+
+def test_permission_policy_bulk_allows(app, mocker, superuser_role_need):
+    spy = mocker.spy(Permission, '_expand_action')
+    records = [{'owners': [1]}, {'owners': [2]}, {'owners': [1, 2]}]
+
+    owner = Identity(1)
+    owner.provides.add(UserNeed(1))
+    assert OwnersPermissionPolicy.bulk_allows('read', records, owner) == [
+        True, False, True
+    ]
+    # superuser-access is only expanded once for the whole batch
+    assert spy.call_count == 1
+
+    superuser = Identity(3)
+    superuser.provides.add(RoleNeed('superuser-access'))
+    assert OwnersPermissionPolicy.bulk_allows(
+        'read', records, superuser) == [True, True, True]
+
+    assert OwnersPermissionPolicy.bulk_allows('delete', records, owner) == [
+        False, False, False
+    ]
+
+    anyone = Identity(4)
+    anyone.provides.add(any_user)
+    assert TestPermissionPolicy.bulk_allows('read', records, anyone) == [
+        True, True, True
+    ]
+    assert TestPermissionPolicy.bulk_allows('random', records, anyone) == [
+        False, False, False
+    ]
+
+
+class PublicOrOwnersPermissionPolicy(BasePermissionPolicy):
+    can_read = [AnyUserIfPublic(), RecordOwners()]
+
+
+@pytest.mark.parametrize("lazy", [True, False])
+def test_permission_policy_allows(app, mocker, superuser_role_need, lazy):
+    mocker.patch.object(PublicOrOwnersPermissionPolicy, 'lazy_allows', lazy)
+    spy = mocker.spy(RecordOwners, 'needs')
+    public = {'owners': [1], '_access': {'metadata_restricted': False}}
+    restricted = {'owners': [1], '_access': {'metadata_restricted': True}}
+
+    anonymous = Identity(None)
+    anonymous.provides.add(any_user)
+    owner = Identity(1)
+    owner.provides |= {any_user, UserNeed(1)}
+    superuser = Identity(2)
+    superuser.provides |= {any_user, UserNeed(2), superuser_role_need}
+
+    def allows(record, identity):
+        return PublicOrOwnersPermissionPolicy(
+            action='read', record=record).allows(identity)
+
+    assert allows(public, anonymous)
+    # Decided by the first generator
+    assert spy.call_count == (0 if lazy else 1)
+
+    assert not allows(restricted, anonymous)
+    assert allows(restricted, owner)
+    assert allows(restricted, superuser)
+
+    assert not TestPermissionPolicy(action='random').allows(superuser)
+    assert not TestPermissionPolicy(action='update').allows(owner)
+    assert TestPermissionPolicy(action='update').allows(superuser)
+
+
+class AllowByDefaultPermissionPolicy(BasePermissionPolicy):
+    allow_by_default = True
+    can_read = []
+    can_update = [Disable()]
+    can_delete = [RecordOwners()]
+    can_search = [AnyUserIfPublic(), RecordOwners()]
+
+
+def test_permission_policy_allows_by_default(app, db):
+    records = [
+        {'owners': [], '_access': {'metadata_restricted': True}},
+        {'owners': [1], '_access': {'metadata_restricted': True}},
+    ]
+    anonymous = Identity(None)
+    anyone = Identity(2)
+    anyone.provides.add(any_user)
+    owner = Identity(1)
+    owner.provides |= {any_user, UserNeed(1)}
+
+    for action in ['read', 'update', 'delete', 'search']:
+        for record in records:
+            for identity in [anonymous, anyone, owner]:
+                policy = AllowByDefaultPermissionPolicy(
+                    action=action, record=record)
+                materialized = BasePermissionPolicy._permits(
+                    policy._load_policy_permissions(), identity.provides)
+                assert AllowByDefaultPermissionPolicy(
+                    action=action, record=record
+                ).allows(identity) is materialized
+                assert AllowByDefaultPermissionPolicy.bulk_allows(
+                    action, [record], identity) == [materialized]
+
+    # Nobody provides the needs
+    assert AllowByDefaultPermissionPolicy(action='read').allows(anyone)
+    assert AllowByDefaultPermissionPolicy(
+        action='update').allows(anonymous)
+    assert not AllowByDefaultPermissionPolicy(action='update').allows(anyone)
+
+
+def test_policy_evaluator(app, superuser_role_need):
+    records = [
+        {'owners': [1], '_access': {'metadata_restricted': False}},
+        {'owners': [1], '_access': {'metadata_restricted': True}},
+        {'owners': [2], '_access': {'metadata_restricted': True}},
+        {'owners': [], '_access': {'metadata_restricted': True}},
+    ]
+    anonymous = Identity(None)
+    anonymous.provides.add(any_user)
+    owner = Identity(1)
+    owner.provides |= {any_user, UserNeed(1)}
+    superuser = Identity(2)
+    superuser.provides |= {any_user, UserNeed(2), superuser_role_need}
+
+    for identity in [anonymous, owner, superuser]:
+        for action in ['read', 'update', 'random']:
+            evaluator = PolicyEvaluator(
+                PublicOrOwnersPermissionPolicy, action, identity
+            )
+            for record in records:
+                policy = PublicOrOwnersPermissionPolicy(
+                    action=action, record=record
+                )
+                assert evaluator.allows(record) == policy.allows(identity)
+
+    assert not hasattr(evaluator, '__dict__')
+
+
+@pytest.fixture()
+def access_cache(app):
+    """In-process ``ACCESS_CACHE`` of invenio-access."""
+    state = app.extensions['invenio-access']
+    previous = state.cache
+    state.cache = TTLCache()
+    yield state.cache
+    state.cache = previous
+
+
+def test_action_expansions_are_cached(app, db, mocker, access_cache):
+    spy = mocker.spy(ActionUsers, 'query_by_action')
+    record = {'owners': [1]}
+
+    assert OwnersPermissionPolicy(action='read', record=record).needs == {
+        UserNeed(1)
+    }
+    assert OwnersPermissionPolicy(action='read', record=record).needs == {
+        UserNeed(1)
+    }
+    assert spy.call_count == 1
+
+    # Granting the action invalidates its cached expansion
+    role = Role(name='superuser-access')
+    db.session.add(role)
+    db.session.add(ActionRoles.create(action=superuser_access, role=role))
+    db.session.commit()
+
+    assert OwnersPermissionPolicy(action='read', record=record).needs == {
+        UserNeed(1), RoleNeed('superuser-access')
+    }
+    assert spy.call_count == 2
+
+    # Renaming the role too
+    role.name = 'administrators'
+    db.session.commit()
+
+    assert OwnersPermissionPolicy(action='read', record=record).needs == {
+        UserNeed(1), RoleNeed('administrators')
+    }
+    assert spy.call_count == 3
+
+
+def test_action_expansions_are_cached_across_requests(app, db, mocker):
+    spy = mocker.spy(ActionUsers, 'query_by_action')
+    state = app.extensions['invenio-records-permissions']
+    assert app.extensions['invenio-access'].cache is state.action_cache
+    state.clear_caches()
+
+    for _ in range(2):
+        with app.test_request_context():
+            assert OwnersPermissionPolicy(
+                action='read', record={'owners': [1]}
+            ).needs == {UserNeed(1)}
+    assert spy.call_count == 1
+
+
+def test_permission_policy_async_can(
+        app, mocker, access_cache, superuser_role_need):
+    spy = mocker.spy(RecordOwners, 'async_needs')
+    records = [
+        {'owners': [1], '_access': {'metadata_restricted': True}},
+        {'owners': [2], '_access': {'metadata_restricted': True}},
+        {'owners': [2], '_access': {'metadata_restricted': False}},
+    ]
+    owner = Identity(1)
+    owner.provides |= {any_user, UserNeed(1)}
+    # Expand superuser-access in this thread: the database session of the
+    # tests is bound to it
+    PublicOrOwnersPermissionPolicy(action='read').needs
+
+    async def check():
+        policies = [
+            PublicOrOwnersPermissionPolicy(action='read', record=record)
+            for record in records
+        ]
+        allowed = await asyncio.gather(*[
+            policy.async_can(owner, app) for policy in policies
+        ])
+        needs = await policies[0].async_needs(app)
+        excludes = await policies[0].async_excludes(app)
+        return allowed, needs, excludes
+
+    loop = asyncio.new_event_loop()
+    try:
+        allowed, needs, excludes = loop.run_until_complete(check())
+    finally:
+        loop.close()
+    assert allowed == [True, False, True]
+    assert needs == {superuser_role_need, UserNeed(1)}
+    assert excludes == set()
+    # The policies were evaluated once
+    assert spy.call_count == 3
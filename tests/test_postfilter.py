@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+import pytest
+from elasticsearch_dsl import Q, Search
+from flask_principal import UserNeed
+
+from invenio_records_permissions.errors import PostFilteringError
+from invenio_records_permissions.generators import AnyUserIfPublic, \
+    Generator, RecordOwners
+from invenio_records_permissions.policies import BasePermissionPolicy
+from invenio_records_permissions.postfilter import PostFilter, \
+    unfiltered_generators
+
+
+class Editors(Generator):
+    """Allows the editors of a record, without a search filter."""
+
+    __slots__ = ()
+
+    def needs(self, record=None, **kwargs):
+        return [UserNeed(editor) for editor in record.get('editors', [])]
+
+
+class EditorsPermissionPolicy(BasePermissionPolicy):
+    can_read = [AnyUserIfPublic(), Editors()]
+
+
+class OwnersPermissionPolicy(BasePermissionPolicy):
+    can_read = [AnyUserIfPublic(), RecordOwners()]
+
+
+class FakeSearch(object):
+    """Search over a list of records, counting the executed pages."""
+
+    def __init__(self, records, pages=None):
+        self.records = records
+        self.pages = [] if pages is None else pages
+        self.slice = slice(0, 10)
+        self.aggs = Search().aggs
+
+    def __getitem__(self, item):
+        search = FakeSearch(self.records, self.pages)
+        search.slice = item
+        return search
+
+    def execute(self):
+        self.pages.append((self.slice.start, self.slice.stop))
+        return self.records[self.slice]
+
+    def count(self):
+        return len(self.records)
+
+
+def make_records(count):
+    return [
+        {
+            'editors': [i % 3],
+            '_access': {'metadata_restricted': True},
+        }
+        for i in range(count)
+    ]
+
+
+def test_unfiltered_generators():
+    assert unfiltered_generators(
+        OwnersPermissionPolicy(action='read')) == []
+    generators = unfiltered_generators(EditorsPermissionPolicy(action='read'))
+    assert [type(generator) for generator in generators] == [Editors]
+
+
+def test_post_filter_search(app, superuser_role_need, create_identity):
+    identity = create_identity(1)
+
+    post_filter = PostFilter(OwnersPermissionPolicy(action='read'), identity)
+    assert not post_filter.post_filtering
+    assert post_filter.apply(Search()).to_dict() == Search().filter(
+        Q('bool', should=[
+            Q('term', **{'_access.metadata_restricted': False}),
+            Q('term', owners=1),
+        ], minimum_should_match=1)
+    ).to_dict()
+
+    # Widened to all the hits
+    post_filter = PostFilter(EditorsPermissionPolicy(action='read'), identity)
+    assert post_filter.post_filtering
+    assert post_filter.apply(Search()).to_dict() == Search().to_dict()
+
+    # Decided by the static generators
+    superuser = create_identity(2)
+    superuser.provides.add(superuser_role_need)
+    post_filter = PostFilter(EditorsPermissionPolicy(action='read'), superuser)
+    assert not post_filter.post_filtering
+    assert post_filter.apply(Search()).to_dict() == Search().to_dict()
+
+
+def test_post_filter_hits(app, superuser_role_need, create_identity):
+    records = make_records(10)
+    post_filter = PostFilter(
+        EditorsPermissionPolicy(action='read'), create_identity(1),
+        batch_size=4
+    )
+
+    assert list(post_filter.filter_hits(records)) == records[1::3]
+    assert post_filter.checked == 10
+    assert post_filter.filtered == 7
+
+
+def test_post_filter_window(app, superuser_role_need, create_identity):
+    records = make_records(30)
+    pages = []
+    post_filter = PostFilter(
+        EditorsPermissionPolicy(action='read'), create_identity(1),
+        batch_size=5
+    )
+
+    window = post_filter.window(FakeSearch(records, pages), start=2, size=3)
+
+    # Allowed hits 2 to 4 are records 7, 10 and 13: three pages fetched
+    assert window == [records[7], records[10], records[13]]
+    assert pages == [(0, 5), (5, 10), (10, 15)]
+    assert post_filter.checked == 15
+    assert post_filter.filtered == 10
+
+    # Exhausted hits
+    pages[:] = []
+    window = post_filter.window(FakeSearch(records, pages), start=8, size=5)
+    assert window == [records[25], records[28]]
+    assert pages[-1] == (30, 35)
+
+
+def test_post_filter_totals(app, superuser_role_need, create_identity):
+    records = make_records(10)
+    search = Search()
+    search.aggs.bucket('editors', 'terms', field='editors')
+
+    # The aggregations would count the denied hits
+    post_filter = PostFilter(
+        EditorsPermissionPolicy(action='read'), create_identity(1),
+        batch_size=4
+    )
+    with pytest.raises(PostFilteringError):
+        post_filter.apply(search)
+    assert post_filter.count(FakeSearch(records)) == 3
+
+    # Without post-filtering
+    post_filter = PostFilter(
+        OwnersPermissionPolicy(action='read'), create_identity(1)
+    )
+    assert post_filter.apply(search).to_dict()['aggs'] == {
+        'editors': {'terms': {'field': 'editors'}}
+    }
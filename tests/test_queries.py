@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+from elasticsearch_dsl import Q
+
+from invenio_records_permissions.queries import MATCH_NONE, simplify_filters
+
+
+def test_simplify_filters_match_all_and_none():
+    public = Q('term', **{'_access.metadata_restricted': False})
+
+    assert simplify_filters([public, Q('match_all')]).to_dict() == {
+        'match_all': {}
+    }
+    assert simplify_filters([~Q('match_all'), public]) == public
+    assert simplify_filters([~Q('match_all')]).to_dict() in MATCH_NONE
+
+
+def test_simplify_filters_merges_terms():
+    public = Q('term', **{'_access.metadata_restricted': False})
+    filters = [
+        Q('term', owners=1),
+        public,
+        Q('terms', owners=[2, 1]),
+        Q('term', owners=3),
+        public,
+        # Object values are left as is
+        Q('term', **{'internal': {'id': 1}}),
+    ]
+
+    assert simplify_filters(filters).to_dict() == {
+        'bool': {
+            'should': [
+                {'terms': {'owners': [1, 2, 3]}},
+                {'term': {'_access.metadata_restricted': False}},
+                {'term': {'internal': {'id': 1}}},
+            ],
+            'minimum_should_match': 1,
+        }
+    }
+    assert simplify_filters([Q('term', owners=1), Q('term', owners=1)]) == \
+        Q('term', owners=1)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+import uuid
+
+from invenio_records_files.models import RecordsBuckets
+
+from invenio_records_permissions.proxies import current_records_permissions
+from invenio_records_permissions.resolvers import bucket_cache_key, \
+    get_bucket_record
+
+
+def test_get_bucket_record(create_real_record, db):
+    record = create_real_record()
+    bucket_id = record['_bucket']
+    cache = current_records_permissions.bucket_cache
+
+    resolved = get_bucket_record(bucket_id)
+    assert resolved.id == record.id
+    assert resolved['owners'] == [1, 2, 3]
+    assert cache.get(bucket_cache_key(bucket_id)) == str(record.id)
+    assert get_bucket_record(bucket_id).id == record.id
+
+    assert get_bucket_record(uuid.uuid4()) is None
+
+
+def test_get_bucket_record_invalidation(create_real_record, db):
+    record = create_real_record()
+    bucket_id = record['_bucket']
+    cache = current_records_permissions.bucket_cache
+
+    assert get_bucket_record(bucket_id).id == record.id
+
+    db.session.delete(
+        RecordsBuckets.query.filter_by(bucket_id=bucket_id).one()
+    )
+    db.session.flush()
+
+    assert cache.get(bucket_cache_key(bucket_id)) is None
+    assert get_bucket_record(bucket_id) is None
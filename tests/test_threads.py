@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2020 CERN.
+# Copyright (C) 2019-2020 Northwestern University.
+#
+# Invenio-Records-Permissions is free software; you can redistribute it
+# and/or modify it under the terms of the MIT License; see LICENSE file for
+# more details.
+
+"""Stress test of shared policies under a multi-threaded WSGI server."""
+
+import json
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen
+
+import pytest
+from flask import Flask, jsonify
+from flask_principal import Identity, UserNeed
+from invenio_access import InvenioAccess
+from invenio_access.models import get_action_cache_key
+from invenio_access.permissions import _P, any_user, superuser_access
+from werkzeug.serving import make_server
+
+from invenio_records_permissions import InvenioRecordsPermissions
+from invenio_records_permissions.cache import TTLCache
+from invenio_records_permissions.generators import AnyUserIfPublic, \
+    RecordOwners
+from invenio_records_permissions.policies import BasePermissionPolicy
+
+RECORDS = 8
+
+
+class PublicOrOwnersPermissionPolicy(BasePermissionPolicy):
+    can_read = [AnyUserIfPublic(), RecordOwners()]
+
+
+@pytest.fixture()
+def server():
+    """Threaded server checking the permissions of shared policies."""
+    app = Flask('test_threads')
+    InvenioAccess(app, cache=TTLCache())
+    InvenioRecordsPermissions(app)
+    with app.app_context():
+        # WHY: No database here, nobody is a super user.
+        app.extensions['invenio-access'].set_action_cache(
+            get_action_cache_key(superuser_access.value, None),
+            _P(set(), set())
+        )
+
+    records = [
+        {'owners': [i], '_access': {'metadata_restricted': i % 2 == 0}}
+        for i in range(RECORDS)
+    ]
+    # Policy instances shared by all the requests
+    policies = [
+        PublicOrOwnersPermissionPolicy(action='read', record=record)
+        for record in records
+    ]
+
+    @app.route('/<int:user>/<int:record>')
+    def check(user, record):
+        identity = Identity(user)
+        identity.provides |= {any_user, UserNeed(user)}
+        policy = policies[record]
+        return jsonify(
+            allowed=policy.allows(identity),
+            needs=sorted(repr(n) for n in policy.needs),
+            thread=threading.get_ident(),
+        )
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        yield server, policies
+    finally:
+        server.shutdown()
+        thread.join()
+
+
+def test_shared_policies_under_threads(server):
+    server, policies = server
+    requests = [
+        (random.randrange(RECORDS), random.randrange(RECORDS))
+        for _ in range(400)
+    ]
+
+    def check(request):
+        user, record = request
+        url = 'http://127.0.0.1:{0}/{1}/{2}'.format(
+            server.server_port, user, record
+        )
+        with urlopen(url) as response:
+            return response.read()
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        responses = list(executor.map(check, requests))
+
+    threads = set()
+    for (user, record), response in zip(requests, responses):
+        result = json.loads(response.decode('utf-8'))
+        threads.add(result['thread'])
+        public = record % 2 == 1
+        assert result['allowed'] == (public or user == record)
+        expected = {UserNeed(record)} | ({any_user} if public else set())
+        assert result['needs'] == sorted(repr(n) for n in expected)
+
+    assert len(threads) > 1
+    # No state accumulated in the shared instances
+    for policy in policies:
+        assert policy.explicit_needs == {superuser_access}
+        assert policy.explicit_excludes == set()